@@ -1,9 +1,68 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
 
+from .closing import close_auctions
+from .fragments import bump_version_on_commit
 from .models import Auction, Bid, Comment, Category, User
+from .pagination import EstimatedCountPaginator
+from .tasks import queue_winner_notifications
+
+CLOSE_BATCH_SIZE = 500
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for tables with millions of rows: estimated totals,
+    no second COUNT(*) for filtered views, and raw id inputs instead of
+    <select>s listing every related row.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(Auction)
+class AuctionAdmin(LargeTableAdmin):
+    list_display = ('id', 'title', 'author', 'category', 'active', 'current_bid', 'bid_count', 'created', 'ends_at')
+    list_select_related = ('author', 'category')
+    # Both filters are served by the partial (active) and category indexes.
+    list_filter = ('active', 'category')
+    raw_id_fields = ('author', 'buyer', 'leading_bid', 'watchers')
+    readonly_fields = ('bid_count', 'last_bid_at', 'closed_at', 'archived_at')
+    actions = ['close_selected']
+
+    @admin.action(description='Close selected auctions and notify the winners')
+    def close_selected(self, request, queryset):
+        ids = list(queryset.filter(active=True).values_list('pk', flat=True))
+        closed = 0
+        for start in range(0, len(ids), CLOSE_BATCH_SIZE):
+            with transaction.atomic():
+                closed += close_auctions(ids[start:start + CLOSE_BATCH_SIZE], notify=queue_winner_notifications)
+        self.message_user(request, f'Closed {closed} auctions.', messages.SUCCESS)
+
+
+@admin.register(Bid)
+class BidAdmin(LargeTableAdmin):
+    list_display = ('id', 'auction', 'user', 'amount', 'created')
+    list_select_related = ('auction__author', 'user')
+    raw_id_fields = ('auction', 'user')
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('id', 'auction', 'user', 'created', 'active')
+    list_select_related = ('auction__author', 'user')
+    raw_id_fields = ('auction', 'user')
+    actions = ['hide_selected']
+
+    @admin.action(description='Hide selected comments')
+    def hide_selected(self, request, queryset):
+        auction_ids = set(queryset.values_list('auction_id', flat=True))
+        hidden = queryset.update(active=False)
+        for auction_id in auction_ids:
+            bump_version_on_commit(auction_id)
+        self.message_user(request, f'Hid {hidden} comments.', messages.SUCCESS)
+
 
-admin.site.register(Auction)
-admin.site.register(Bid)
-admin.site.register(Comment)
 admin.site.register(Category)
 admin.site.register(User)
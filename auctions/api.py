@@ -0,0 +1,215 @@
+"""
+Read-only JSON API.
+
+Auction detail and bid history carry a strong ETag built from the auction's
+fragment cache version (see fragments.py), which every change to the auction,
+its bids or its comments bumps. A request whose If-None-Match matches is
+answered 304 from the cache alone, without touching the ORM. Detail payloads
+are cached per version as well, so a changed ETag costs one query until the
+next change.
+
+Listings and categories are validated by a hash of the response body instead.
+
+Every auction endpoint takes ?fields=a,b to return only those fields, e.g.
+?fields=current_bid.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, urlencode
+from django.views import View
+
+from .archive import bids_for
+from .categories import category_registry
+from .fragments import FRAGMENT_TIMEOUT, get_version
+from .models import Auction
+from .pagination import CursorPaginator, InvalidCursor
+
+PAGE_SIZE = 20
+AUCTION_FIELDS = (
+    'id', 'title', 'description', 'url', 'image', 'author', 'category', 'starting_bid', 'current_bid',
+    'bid_count', 'active', 'created', 'ends_at', 'last_bid_at', 'closed_at',
+)
+
+
+class InvalidFields(Exception):
+    pass
+
+
+def auction_data(auction):
+    return {
+        'id': auction.pk,
+        'title': auction.title,
+        'description': auction.description,
+        'url': auction.get_absolute_url(),
+        'image': auction.image.url if auction.image else None,
+        'author': auction.author.username,
+        'category': auction.category.category_name,
+        'starting_bid': auction.starting_bid,
+        'current_bid': auction.current_bid,
+        'bid_count': auction.bid_count,
+        'active': auction.active,
+        'created': auction.created,
+        'ends_at': auction.ends_at,
+        'last_bid_at': auction.last_bid_at,
+        'closed_at': auction.closed_at,
+    }
+
+
+def selected_fields(request):
+    """The fields named by ?fields=, or None for all of them. Raises InvalidFields for unknown names."""
+    value = request.GET.get('fields')
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in AUCTION_FIELDS]
+    if unknown or not fields:
+        raise InvalidFields(f'Unknown fields: {", ".join(unknown)}. Choose from {", ".join(AUCTION_FIELDS)}.')
+    return fields
+
+
+def select(data, fields):
+    return data if fields is None else {name: data[name] for name in fields}
+
+
+def api_error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def json_response(data, etag, last_modified=None):
+    response = HttpResponse(json.dumps(data, cls=DjangoJSONEncoder), content_type='application/json')
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def body_etag(data):
+    return quote_etag(hashlib.sha1(json.dumps(data, cls=DjangoJSONEncoder).encode()).hexdigest())
+
+
+def conditional(request, etag, last_modified=None):
+    """A 304 response if the request's validators match, otherwise None."""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+class ApiView(View):
+    """Base view that answers bad ?fields= and ?cursor= values and missing objects with JSON errors."""
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.fields = selected_fields(request)
+            return super().dispatch(request, *args, **kwargs)
+        except InvalidFields as e:
+            return api_error(str(e), 400)
+        except InvalidCursor:
+            return api_error('Invalid cursor.', 400)
+        except Http404 as e:
+            return api_error(str(e), 404)
+
+    def versioned_etag(self, auction_id, version, kind):
+        key = f'{kind}:{auction_id}:{version}:{self.request.GET.urlencode()}'
+        return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+    def next_url(self, page):
+        if not page.has_next():
+            return None
+        query = self.request.GET.copy()
+        query['cursor'] = page.next_cursor
+        return f'{self.request.path}?{query.urlencode()}'
+
+
+class AuctionDetail(ApiView):
+    """JSON detail of one auction."""
+
+    def get(self, request, auction_id):
+        # Read before the auction, so data cached under a version is never older than it.
+        version = get_version(auction_id)
+        etag = self.versioned_etag(auction_id, version, 'detail')
+        # If-None-Match is answered before any query.
+        response = conditional(request, etag)
+        if response is not None:
+            return response
+
+        key = f'auctions:api:auction:{auction_id}:{version}'
+        data = cache.get(key)
+        if data is None:
+            auction = get_object_or_404(Auction.objects.select_related('author', 'category'), pk=auction_id)
+            data = auction_data(auction)
+            cache.set(key, data, FRAGMENT_TIMEOUT)
+        last_modified = data['last_bid_at'] or data['created']
+        return conditional(request, etag, last_modified) or json_response(
+            select(data, self.fields), etag, last_modified,
+        )
+
+
+class AuctionBids(ApiView):
+    """JSON bid history of one auction, newest first."""
+
+    def get(self, request, auction_id):
+        etag = self.versioned_etag(auction_id, get_version(auction_id), 'bids')
+        response = conditional(request, etag)
+        if response is not None:
+            return response
+
+        auction = get_object_or_404(Auction.objects.only('archived_at'), pk=auction_id)
+        page = CursorPaginator(bids_for(auction).select_related('user'), PAGE_SIZE).page(request.GET.get('cursor'))
+        data = {
+            'results': [
+                {'id': bid.pk, 'user': bid.user.username, 'amount': bid.amount, 'created': bid.created}
+                for bid in page
+            ],
+            'next': self.next_url(page),
+        }
+        return json_response(data, etag)
+
+
+class AuctionList(ApiView):
+    """JSON listing of active auctions, newest first, optionally in one category."""
+
+    def get(self, request):
+        queryset = Auction.objects.filter(active=True).select_related('author', 'category')
+        category_name = request.GET.get('category')
+        if category_name:
+            category = category_registry.get(category_name)
+            if category is None:
+                raise Http404('No such category.')
+            queryset = queryset.filter(category=category)
+        page = CursorPaginator(queryset, PAGE_SIZE).page(request.GET.get('cursor'))
+        data = {
+            'results': [select(auction_data(auction), self.fields) for auction in page],
+            'next': self.next_url(page),
+        }
+        etag = body_etag(data)
+        return conditional(request, etag) or json_response(data, etag)
+
+
+class CategoryList(ApiView):
+    """JSON list of categories with their listing URLs."""
+
+    def get(self, request):
+        data = {
+            'results': [
+                {
+                    'id': category.pk,
+                    'name': category.category_name,
+                    'auctions': f"{reverse('api_auctions')}?{urlencode({'category': category.category_name})}",
+                }
+                for category in category_registry.all()
+            ],
+        }
+        etag = body_etag(data)
+        return conditional(request, etag) or json_response(data, etag)
@@ -0,0 +1,85 @@
+"""
+Archival of closed auctions.
+
+Bids and comments of auctions closed for longer than a retention period are
+moved, with their original ids, from the hot Bid and Comment tables into
+ArchivedBid and ArchivedComment. Readers go through bids_for() and
+comment_page(..., archived=True), so an archived auction's page looks the
+same as before.
+
+Each batch of auctions is copied and deleted with INSERT ... SELECT and
+DELETE in one transaction, and stamped with archived_at, so an interrupted
+run simply continues with the next unarchived batch.
+"""
+import time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .fragments import bump_version_on_commit
+from .models import ArchivedBid, ArchivedComment, Auction, Bid, Comment
+
+ARCHIVED_COLUMNS = {
+    Bid: (ArchivedBid, ['id', 'auction_id', 'user_id', 'amount', 'created']),
+    Comment: (ArchivedComment, ['id', 'user_id', 'auction_id', 'comment', 'created', 'active']),
+}
+
+
+def bids_for(auction):
+    """Bids of an auction, from the archive if it has been archived."""
+    model = ArchivedBid if auction.archived_at else Bid
+    return model.objects.filter(auction_id=auction.pk)
+
+
+def is_archived(auction_id):
+    return Auction.objects.filter(pk=auction_id, archived_at__isnull=False).exists()
+
+
+def _move_rows(cursor, model, auction_ids):
+    archive_model, columns = ARCHIVED_COLUMNS[model]
+    qn = connection.ops.quote_name
+    column_list = ', '.join(qn(column) for column in columns)
+    placeholders = ', '.join(['%s'] * len(auction_ids))
+    source = qn(model._meta.db_table)
+    cursor.execute(
+        f'INSERT INTO {qn(archive_model._meta.db_table)} ({column_list}) '
+        f'SELECT {column_list} FROM {source} WHERE {qn("auction_id")} IN ({placeholders})',
+        auction_ids,
+    )
+    # Raw DELETE: the ORM would load every row to send post_delete signals.
+    cursor.execute(f'DELETE FROM {source} WHERE {qn("auction_id")} IN ({placeholders})', auction_ids)
+    return cursor.rowcount
+
+
+def archive_closed_auctions(older_than, now=None, batch_size=100, time_limit=None):
+    """
+    Archive auctions closed before now - older_than, batch_size auctions per
+    transaction. Stops after time_limit seconds if given. Returns
+    (auctions, bids, comments) archived.
+    """
+    now = now or timezone.now()
+    cutoff = now - older_than
+    deadline = time.monotonic() + time_limit if time_limit else None
+    auctions = bids = comments = 0
+
+    while deadline is None or time.monotonic() < deadline:
+        with transaction.atomic():
+            ids = list(
+                Auction.objects.select_for_update(skip_locked=True)
+                .filter(active=False, archived_at__isnull=True, closed_at__lt=cutoff)
+                .order_by('closed_at')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            # leading_bid points into the rows that are about to move.
+            Auction.objects.filter(pk__in=ids).update(leading_bid=None, archived_at=now)
+            with connection.cursor() as cursor:
+                bids += _move_rows(cursor, Bid, ids)
+                comments += _move_rows(cursor, Comment, ids)
+            for auction_id in ids:
+                bump_version_on_commit(auction_id)
+            auctions += len(ids)
+
+    return auctions, bids, comments
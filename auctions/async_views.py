@@ -0,0 +1,78 @@
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from django.http import Http404
+
+from . import views
+from .models import Auction
+from .pagination import InvalidCursor
+from .watchlist import annotate_watched
+
+
+async def load_user(request):
+    """Resolve the lazy request.user off the event loop, so later access is free."""
+    await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+class AsyncListMixin:
+    """
+    Async ListView.get for DataMixin listings. The count and page queries go
+    through the async ORM; template rendering runs in a worker thread as for
+    any TemplateResponse.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        await load_user(request)
+        self.object_list = await sync_to_async(self.get_queryset)()
+        queryset = annotate_watched(self.object_list, request.user)
+        self.page_result = await self.apaginate_queryset(queryset, self.get_paginate_by(queryset))
+
+        if not self.get_allow_empty() and not self.page_result[2]:
+            raise Http404(f'Empty list and “{type(self).__name__}.allow_empty” is False.')
+        context = await sync_to_async(self.get_context_data)()
+        return self.render_to_response(context)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        paginator = self.get_cursor_paginator(queryset, page_size)
+        if paginator is not None:
+            try:
+                page = await paginator.apage(self.request.GET.get('cursor'))
+            except InvalidCursor:
+                raise Http404('Invalid cursor.')
+            return paginator, page, page.object_list, page.has_other_pages()
+
+        paginator = self.get_paginator(queryset, page_size, allow_empty_first_page=self.get_allow_empty())
+        paginator.count = await queryset.acount()
+        try:
+            page = paginator.page(int(self.request.GET.get(self.page_kwarg) or 1))
+        except (ValueError, InvalidPage) as e:
+            raise Http404(f'Invalid page: {e}')
+        page.object_list = [auction async for auction in page.object_list]
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.page_result
+
+
+class AuctionsHome(AsyncListMixin, views.AuctionsHome):
+    """Async version of AuctionsHome."""
+
+
+class AuctionCategory(AsyncListMixin, views.AuctionCategory):
+    """Async version of AuctionCategory."""
+
+
+class AuctionSearch(AsyncListMixin, views.AuctionSearch):
+    """Async version of AuctionSearch."""
+
+
+class AuctionPage(views.AuctionPage):
+    """Async version of AuctionPage."""
+
+    async def get(self, request, *args, **kwargs):
+        await load_user(request)
+        try:
+            self.object = await self.get_queryset().aget(pk=self.kwargs[self.pk_url_kwarg])
+        except Auction.DoesNotExist:
+            raise Http404('No auction found matching the query')
+        context = await sync_to_async(self.get_context_data)(object=self.object)
+        return self.render_to_response(context)
@@ -0,0 +1,34 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+# Short, because queryset .update() calls bypass the signals that drop the cached copy.
+USER_CACHE_TIMEOUT = 60
+
+
+def user_cache_key(user_id):
+    return f'auctions:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose get_user, called by AuthenticationMiddleware on every
+    request, reads the user from the cache instead of the database. Saving or
+    deleting a user and logging out drop the cached copy (see signals.py), so
+    a password change still invalidates other sessions through the session
+    auth hash. A deactivation or password change made with a queryset
+    update() sends no signal and takes effect once the cached copy expires,
+    after at most USER_CACHE_TIMEOUT seconds.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
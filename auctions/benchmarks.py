@@ -0,0 +1,194 @@
+"""
+Endpoint benchmarks for the auction app.
+
+Each scenario prepares one request against the current database (normally
+one filled by the seed_data command) and returns a thunk; only the thunk is
+timed, through the Django test client, so the numbers cover URL resolution,
+middleware, views, ORM and templates but not the network or the WSGI server.
+The bid and close scenarios write to the database.
+"""
+import random
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Auction, Bid, Category, Comment, User
+from .watchlist import Watch
+
+POOL_SIZE = 1000
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class BenchmarkContext:
+    """Sample data and logged-in clients shared by the scenarios."""
+
+    def __init__(self, seed=1):
+        self.rng = random.Random(seed)
+        self.host = next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost'
+        )
+        self.anonymous = Client(SERVER_NAME=self.host)
+        self._clients = {}
+        self.auctions = list(
+            Auction.objects.filter(active=True).order_by('-created', '-id').values_list('pk', 'author_id')[:POOL_SIZE]
+        )
+        if not self.auctions:
+            raise BenchmarkError('There are no active auctions; run seed_data first.')
+        self.closable = list(self.auctions)
+        self.rng.shuffle(self.closable)
+        pool = Auction.objects.filter(pk__in=[pk for pk, _ in self.auctions])
+        self.categories = list(
+            Category.objects.filter(pk__in=pool.values('category_id')).values_list('category_name', flat=True)
+        )
+        titles = pool.values_list('title', flat=True)[:50]
+        self.search_terms = sorted({word.lower() for title in titles for word in title.split()})
+        authors = {author_id for _, author_id in self.auctions}
+        self.bidder = User.objects.exclude(pk__in=authors).order_by('pk').first()
+        if self.bidder is None:
+            raise BenchmarkError('Every user authored a sampled auction; seed more users.')
+
+    def client_for(self, user):
+        if user.pk not in self._clients:
+            client = Client(SERVER_NAME=self.host)
+            client.force_login(user)
+            self._clients[user.pk] = client
+        return self._clients[user.pk]
+
+
+def index(ctx):
+    return lambda: ctx.anonymous.get(reverse('index'))
+
+
+def index_authenticated(ctx):
+    # Compared with index, shows what the session and user lookups cost per request.
+    client = ctx.client_for(ctx.bidder)
+    return lambda: client.get(reverse('index'))
+
+
+def category(ctx):
+    url = reverse('category_view', args=[ctx.rng.choice(ctx.categories)])
+    return lambda: ctx.anonymous.get(url)
+
+
+def search(ctx):
+    term = ctx.rng.choice(ctx.search_terms)
+    return lambda: ctx.anonymous.get(reverse('search'), {'q': term})
+
+
+def auction_page(ctx):
+    url = reverse('auction', args=[ctx.rng.choice(ctx.auctions)[0]])
+    return lambda: ctx.anonymous.get(url)
+
+
+def bid(ctx):
+    auction_id, _ = ctx.rng.choice(ctx.auctions)
+    auction = Auction.objects.get(pk=auction_id)
+    amount = (auction.current_bid or auction.starting_bid) + 1
+    client = ctx.client_for(ctx.bidder)
+    url = reverse('auction_bid', args=[auction_id])
+    return lambda: client.post(url, {'amount': amount})
+
+
+def close(ctx):
+    if not ctx.closable:
+        raise BenchmarkError('Ran out of active auctions to close; lower --repeat.')
+    auction_id, author_id = ctx.closable.pop()
+    ctx.auctions.remove((auction_id, author_id))
+    client = ctx.client_for(User.objects.get(pk=author_id))
+    url = reverse('auction_close', args=[auction_id])
+    return lambda: client.get(url)
+
+
+SCENARIOS = {
+    'index': index,
+    'index_authenticated': index_authenticated,
+    'category': category,
+    'search': search,
+    'auction': auction_page,
+    'bid': bid,
+    'close': close,
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list; 0.0 when it is empty."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(ctx, scenario, repeat, warmup):
+    timings, queries = [], []
+    for i in range(warmup + repeat):
+        request = scenario(ctx)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request()
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            raise BenchmarkError(f'{scenario.__name__} returned HTTP {response.status_code}.')
+        if i >= warmup:
+            timings.append(elapsed)
+            queries.append(len(captured))
+    timings.sort()
+    return {
+        'runs': repeat,
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'min_ms': round(timings[0], 3),
+        'max_ms': round(timings[-1], 3),
+        'queries': statistics.median_low(queries),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names=None, repeat=50, warmup=5, seed=1, label=None):
+    """Run the named scenarios (default: all) and return a JSON-serialisable report."""
+    ctx = BenchmarkContext(seed)
+    results = {}
+    for name in names or SCENARIOS:
+        results[name] = run_scenario(ctx, SCENARIOS[name], repeat, warmup)
+    return {
+        'label': label,
+        'git_revision': git_revision(),
+        'created': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'dataset': {
+            'users': User.objects.count(),
+            'auctions': Auction.objects.count(),
+            'bids': Bid.objects.count(),
+            'comments': Comment.objects.count(),
+            'watches': Watch.objects.count(),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline):
+    """Yield (scenario, baseline median, median, change in percent) for scenarios present in both reports."""
+    for name, result in report['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before and before['median_ms']:
+            change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100
+            yield name, before['median_ms'], result['median_ms'], change
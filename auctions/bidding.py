@@ -0,0 +1,50 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Auction, Bid
+from .watchlist import Watch
+
+ACCEPTED = 'accepted'
+REJECTED = 'rejected'
+OUTBID = 'outbid'
+
+BidResult = namedtuple('BidResult', ['status', 'bid', 'current_bid'])
+
+
+def place_bid(auction_id, user, amount):
+    """
+    Place a bid with a single conditional UPDATE, so the price check and the
+    price change happen in the database and no lock is held across Python code.
+    The denormalized bid statistics on Auction are maintained in the same
+    transaction.
+
+    Returns a BidResult whose status is ACCEPTED, OUTBID (someone already holds
+    an equal or higher bid) or REJECTED (auction closed or ended, or amount
+    below the starting price). Raises Auction.DoesNotExist for an unknown auction.
+    """
+    amount = Decimal(amount)
+    now = timezone.now()
+
+    with transaction.atomic():
+        accepted = Auction.objects.filter(
+            Q(current_bid__isnull=True, starting_bid__lte=amount) | Q(current_bid__lt=amount),
+            Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+            pk=auction_id,
+            active=True,
+        ).update(current_bid=amount, bid_count=F('bid_count') + 1, last_bid_at=now)
+
+        if accepted:
+            bid = Bid.objects.create(auction_id=auction_id, user=user, amount=amount, created=now)
+            Auction.objects.filter(pk=auction_id).update(leading_bid=bid)
+            Watch.objects.bulk_create([Watch(auction_id=auction_id, user_id=user.pk)], ignore_conflicts=True)
+            return BidResult(ACCEPTED, bid, amount)
+
+    auction = Auction.objects.values('active', 'ends_at', 'current_bid').get(pk=auction_id)
+    is_open = auction['active'] and (auction['ends_at'] is None or auction['ends_at'] > now)
+    if is_open and auction['current_bid'] is not None and auction['current_bid'] >= amount:
+        return BidResult(OUTBID, None, auction['current_bid'])
+    return BidResult(REJECTED, None, auction['current_bid'])
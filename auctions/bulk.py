@@ -0,0 +1,201 @@
+"""
+Bulk import and export of auctions as CSV or JSON Lines.
+
+Imports stream rows from the file and validate them with AuctionForm, with
+the category given by name and resolved through category_registry, so a
+valid row costs no query. Every batch_size rows the valid ones are inserted
+with one bulk_create and the invalid ones are reported by line number.
+
+Exports stream auctions or their bid histories row by row from
+QuerySet.iterator(), so memory use does not grow with the number of rows.
+"""
+import csv
+import heapq
+import io
+import json
+from collections import namedtuple
+from itertools import islice
+
+from django import forms
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .categories import category_registry
+from .forms import AuctionForm
+from .models import ArchivedBid, Auction, Bid
+from .tasks import process_image
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+IMPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+AUCTION_COLUMNS = [
+    'id', 'title', 'description', 'starting_bid', 'current_bid', 'category', 'author', 'image', 'active',
+    'created', 'ends_at', 'bid_count',
+]
+BID_COLUMNS = ['id', 'auction_id', 'user', 'amount', 'created']
+
+ImportResult = namedtuple('ImportResult', ['created', 'errors'])
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def detect_format(filename, fmt=None):
+    """The explicit format if given, otherwise the one named by the file extension."""
+    fmt = (fmt or filename.rsplit('.', 1)[-1]).lower()
+    if fmt == 'ndjson':
+        fmt = 'jsonl'
+    if fmt not in FORMATS:
+        raise UnsupportedFormat(f'Unsupported format "{fmt}"; use one of {", ".join(FORMATS)}.')
+    return fmt
+
+
+class AuctionImportForm(AuctionForm):
+    """AuctionForm for one imported row: the category is a name and the image an already stored file."""
+    category = forms.CharField(max_length=50)
+    image = forms.CharField(max_length=100, required=False)
+
+    class Meta(AuctionForm.Meta):
+        # category is set by import_auctions, which keeps model validation from checking it with a query per row.
+        fields = ['title', 'description', 'starting_bid', 'image', 'ends_at']
+
+    def clean_category(self):
+        category = category_registry.get(self.cleaned_data['category'])
+        if category is None:
+            raise forms.ValidationError('Unknown category.')
+        return category
+
+    def clean_image(self):
+        name = self.cleaned_data['image']
+        if name and not Auction._meta.get_field('image').storage.exists(name):
+            raise forms.ValidationError('No stored image with this name.')
+        return name
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, row dict) from a text stream; a row that cannot be parsed is an exception instead."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError('Expected a JSON object.')
+
+
+def open_text(binary_file):
+    """Wrap an uploaded or opened binary file for read_rows, accepting a UTF-8 byte order mark."""
+    return io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+
+
+def import_auctions(rows, author, batch_size=None):
+    """
+    Create auctions by author from (line number, row) pairs. Returns an
+    ImportResult with the number created and (line number, {field: messages})
+    for each rejected row.
+    """
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    created = 0
+    errors = []
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        auctions = []
+        for line_number, row in batch:
+            if isinstance(row, Exception):
+                errors.append((line_number, {'__all__': [f'Invalid row: {row}']}))
+                continue
+            form = AuctionImportForm(data={key: value for key, value in row.items() if value is not None})
+            if not form.is_valid():
+                errors.append((line_number, {field: list(messages) for field, messages in form.errors.items()}))
+                continue
+            auction = form.save(commit=False)
+            auction.author = author
+            auction.category = form.cleaned_data['category']
+            auctions.append(auction)
+
+        if auctions:
+            with transaction.atomic():
+                # bulk_create sends no post_save, so queue the image variants here.
+                auctions = Auction.objects.bulk_create(auctions)
+                with_images = [auction.pk for auction in auctions if auction.image]
+                transaction.on_commit(lambda ids=with_images: [process_image.delay(pk) for pk in ids])
+            created += len(auctions)
+    return ImportResult(created, errors)
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def auction_rows(queryset):
+    auctions = queryset.select_related('author', 'category').order_by('pk')
+    for auction in auctions.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'id': auction.pk,
+            'title': auction.title,
+            'description': auction.description,
+            'starting_bid': auction.starting_bid,
+            'current_bid': auction.current_bid,
+            'category': auction.category.category_name,
+            'author': auction.author.username,
+            'image': auction.image.name,
+            'active': auction.active,
+            'created': isoformat(auction.created),
+            'ends_at': isoformat(auction.ends_at),
+            'bid_count': auction.bid_count,
+        }
+
+
+def bid_rows(auction_queryset):
+    """Bids of the given auctions, archived ones included, ordered by auction and then id."""
+    querysets = [
+        model.objects.filter(auction__in=auction_queryset.values('pk'))
+        .select_related('user').order_by('auction_id', 'pk').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for model in (Bid, ArchivedBid)
+    ]
+    # Both tables are read in (auction, id) order, so merging keeps each auction's bids together.
+    for bid in heapq.merge(*querysets, key=lambda bid: (bid.auction_id, bid.pk)):
+        yield {
+            'id': bid.pk,
+            'auction_id': bid.auction_id,
+            'user': bid.user.username,
+            'amount': bid.amount,
+            'created': isoformat(bid.created),
+        }
+
+
+class Echo:
+    """File-like object whose write() returns the value, for a csv.writer feeding a generator."""
+
+    def write(self, value):
+        return value
+
+
+def encode_rows(rows, columns, fmt):
+    """Yield the rows as lines of CSV (with a header) or JSON Lines."""
+    if fmt == 'csv':
+        writer = csv.DictWriter(Echo(), fieldnames=columns)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(queryset, what, fmt):
+    """Lines of an export of the auctions in queryset ('auctions') or of their bids ('bids')."""
+    if what == 'bids':
+        return encode_rows(bid_rows(queryset), BID_COLUMNS, fmt)
+    return encode_rows(auction_rows(queryset), AUCTION_COLUMNS, fmt)
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from .models import Category
+
+
+class LocalTTLCache:
+    """A small thread-safe in-process LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, maxsize=128, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CategoryRegistry:
+    """
+    Read-through cache of all categories with two tiers: a per-process LRU
+    and the shared Django cache. Category signals call invalidate(); other
+    processes pick the change up when their local entry expires.
+    """
+    cache_key = 'auctions:categories'
+    timeout = 60 * 60
+
+    def __init__(self, local_ttl=30):
+        self.local = LocalTTLCache(maxsize=8, ttl=local_ttl)
+
+    def all(self):
+        categories = self.local.get(self.cache_key)
+        if categories is None:
+            categories = cache.get(self.cache_key)
+            if categories is None:
+                categories = list(Category.objects.order_by('category_name'))
+                cache.set(self.cache_key, categories, self.timeout)
+            self.local.set(self.cache_key, categories)
+        return categories
+
+    def get(self, category_name):
+        """Return the category with this name, or None."""
+        for category in self.all():
+            if category.category_name == category_name:
+                return category
+        return None
+
+    def invalidate(self):
+        self.local.delete(self.cache_key)
+        cache.delete(self.cache_key)
+
+
+category_registry = CategoryRegistry()
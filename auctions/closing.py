@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .events import publish_event_on_commit
+from .fragments import bump_version_on_commit
+from .models import Auction, Bid
+from .trending import forget_on_commit
+
+
+def close_auctions(ids, notify, now=None):
+    """
+    Close the given auctions in the current transaction. Each winner is taken
+    from leading_bid in the same UPDATE that closes the auction, and
+    notify(auction_ids) is called with the winners once the transaction
+    commits. Auctions that are already closed are left alone: only the rows
+    locked and closed here are notified, bumped and published. Returns the
+    number of auctions closed.
+    """
+    now = now or timezone.now()
+    ids = list(Auction.objects.select_for_update().filter(pk__in=ids, active=True).values_list('pk', flat=True))
+    if not ids:
+        return 0
+    winner = Subquery(Bid.objects.filter(pk=OuterRef('leading_bid')).values('user')[:1])
+    closed = Auction.objects.filter(pk__in=ids, active=True).update(active=False, buyer=winner, closed_at=now)
+    winners = list(Auction.objects.filter(pk__in=ids, buyer__isnull=False).values_list('pk', flat=True))
+    if winners:
+        transaction.on_commit(lambda: notify(winners))
+    for auction_id in ids:
+        bump_version_on_commit(auction_id)
+        publish_event_on_commit(auction_id, 'close', {})
+    forget_on_commit(ids)
+    return closed
+
+
+def close_expired_auctions(notify, now=None, batch_size=500):
+    """
+    Close active auctions whose ends_at has passed, batch_size rows per
+    transaction so the sweep never holds locks on the whole table. Returns
+    the number of auctions closed.
+    """
+    now = now or timezone.now()
+    closed = 0
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Auction.objects.select_for_update(skip_locked=True)
+                .filter(active=True, ends_at__lte=now)
+                .order_by('ends_at')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            closed += close_auctions(ids, notify, now)
+
+    return closed
@@ -0,0 +1,236 @@
+"""
+Live auction events (bids, comments, closing) pushed to browsers as
+Server-Sent Events.
+
+Publishers are ordinary sync Django code; they call publish_event_on_commit.
+Subscribers are EventStreamApp connections served by commerce/asgi.py; each
+idle connection is one coroutine waiting on a bounded asyncio.Queue, so a
+worker can hold thousands of them.
+
+Bids and closes are published by WSGI workers and Celery while the streams
+are served by the ASGI app, so AUCTIONS_EVENTS_REDIS_URL must point every
+process at the same Redis, which fans messages out through pub/sub. Without
+it get_broker() raises ImproperlyConfigured, unless AUCTIONS_EVENTS_IN_PROCESS
+allows the in-process broker for a single process that does everything
+(tests, a lone ASGI development server). EventStreamApp checks this at
+startup.
+
+Publishing never fails the write that triggered it: the bid or comment has
+already committed. Without a broker (runserver, a hand-started worker) the
+event is dropped, and a broker error is logged on the auctions.events logger.
+"""
+import asyncio
+import json
+import logging
+import re
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+CHANNEL_PREFIX = 'auctions:auction:'
+HEARTBEAT_INTERVAL = 15
+QUEUE_SIZE = 100
+
+logger = logging.getLogger('auctions.events')
+
+
+def channel_name(auction_id):
+    return f'{CHANNEL_PREFIX}{auction_id}:events'
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+def _put(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # A stalled client loses events rather than growing the queue forever.
+        pass
+
+
+class InMemoryBroker:
+    """Fans messages out to subscriber queues in this process. publish() is safe to call from any thread."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, set())
+            subscribers.difference_update({item for item in subscribers if item[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_put, queue, message)
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Publishes through Redis and runs one pattern subscription per process
+    that hands messages to the local subscribers.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._client = None
+        self._listener = None
+
+    def publish(self, channel, message):
+        import redis
+
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(channel, message)
+
+    def subscribe(self, channel):
+        queue = super().subscribe(channel)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        return queue
+
+    async def _listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+        try:
+            async for item in pubsub.listen():
+                if item['type'] == 'pmessage':
+                    self.deliver(item['channel'].decode(), item['data'])
+        finally:
+            await pubsub.close()
+            await client.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = getattr(settings, 'AUCTIONS_EVENTS_REDIS_URL', None)
+            if url:
+                _broker = RedisBroker(url)
+            elif getattr(settings, 'AUCTIONS_EVENTS_IN_PROCESS', False):
+                _broker = InMemoryBroker()
+            else:
+                raise ImproperlyConfigured(
+                    'Set AUCTIONS_EVENTS_REDIS_URL so events published by one process reach streams served by '
+                    'another, or AUCTIONS_EVENTS_IN_PROCESS if a single process publishes and streams.'
+                )
+        return _broker
+
+
+def set_broker(broker):
+    """Replace the process broker, e.g. with a fresh InMemoryBroker in tests."""
+    global _broker
+    with _broker_lock:
+        _broker = broker
+
+
+def publish_event(auction_id, event, data):
+    try:
+        broker = get_broker()
+    except ImproperlyConfigured:
+        # No process can be streaming without a broker, so there is nobody to tell.
+        return
+    broker.publish(channel_name(auction_id), format_event(event, data))
+
+
+def publish_event_on_commit(auction_id, event, data):
+    def publish():
+        try:
+            publish_event(auction_id, event, data)
+        except Exception:
+            logger.exception('Could not publish %s event for auction %s', event, auction_id)
+
+    transaction.on_commit(publish)
+
+
+class EventStreamApp:
+    """
+    ASGI application that serves GET /auction/<id>/events as an SSE stream and
+    hands every other request to the wrapped application.
+    """
+    path_re = re.compile(r'^/auction/(?P<auction_id>\d+)/events$')
+
+    def __init__(self, application, heartbeat=HEARTBEAT_INTERVAL):
+        self.application = application
+        self.heartbeat = heartbeat
+        # A missing broker configuration fails at startup instead of on the first stream.
+        get_broker()
+
+    async def __call__(self, scope, receive, send):
+        match = self.path_re.match(scope.get('path', '')) if scope['type'] == 'http' else None
+        if match is None or scope['method'] != 'GET':
+            return await self.application(scope, receive, send)
+        await self.stream(int(match['auction_id']), receive, send)
+
+    async def stream(self, auction_id, receive, send):
+        broker = get_broker()
+        channel = channel_name(auction_id)
+        queue = broker.subscribe(channel)
+        disconnected = asyncio.get_running_loop().create_task(self._wait_for_disconnect(receive))
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+            while not disconnected.done():
+                message = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({message, disconnected}, timeout=self.heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if message in done:
+                    await send({'type': 'http.response.body', 'body': message.result(), 'more_body': True})
+                    continue
+                message.cancel()
+                if not done:
+                    await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except OSError:
+            pass
+        finally:
+            disconnected.cancel()
+            broker.unsubscribe(channel, queue)
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
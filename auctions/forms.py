@@ -1,23 +1,33 @@
 from django import forms
+from django.utils import timezone
 from .models import Auction, Bid, Comment
 
 
 class AuctionForm(forms.ModelForm):
     class Meta:
         model = Auction
-        fields = ['title', 'description', 'starting_bid', 'image', 'category']
+        fields = ['title', 'description', 'starting_bid', 'image', 'category', 'ends_at']
+        labels = {'ends_at': 'Ends at'}
         widgets = {
             'title': forms.TextInput(attrs={'placeholder': 'Enter name', 'class': "form-control"}),
             'description': forms.Textarea(
                 attrs={'placeholder': 'Enter description', 'class': "form-control", 'rows': 5}),
             'starting_bid': forms.NumberInput(attrs={'placeholder': 'Enter price', 'class': "form-control"}),
-            'category': forms.Select(attrs={'class': "form-select"})
+            'category': forms.Select(attrs={'class': "form-select"}),
+            'ends_at': forms.DateTimeInput(
+                attrs={'type': 'datetime-local', 'class': "form-control"}, format='%Y-%m-%dT%H:%M'),
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['category'].empty_label = 'not selected'
 
+    def clean_ends_at(self):
+        ends_at = self.cleaned_data['ends_at']
+        if ends_at is not None and ends_at <= timezone.now():
+            raise forms.ValidationError('The end time must be in the future.')
+        return ends_at
+
 
 class BidForm(forms.ModelForm):
     class Meta:
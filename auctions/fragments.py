@@ -0,0 +1,37 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+FRAGMENT_TIMEOUT = 60 * 10
+
+
+def version_key(auction_id):
+    return f'auctions:auction:{auction_id}:version'
+
+
+def get_version(auction_id):
+    """
+    Return the auction's fragment cache version. A missing counter starts from
+    the current time in microseconds, so it never reuses a version whose
+    fragments may still be cached.
+    """
+    key = version_key(auction_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns() // 1000
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(auction_id):
+    try:
+        cache.incr(version_key(auction_id))
+    except ValueError:
+        # No counter yet: the next get_version starts a fresh one.
+        pass
+
+
+def bump_version_on_commit(auction_id):
+    transaction.on_commit(lambda: bump_version(auction_id))
@@ -0,0 +1,156 @@
+"""
+Derived images for auction photos.
+
+Every upload gets fixed-size thumbnails for listing cards and a few
+aspect-preserving widths for the auction page, each as WebP and JPEG. The
+names are stored in Auction.image_variants:
+
+    {
+        'source': 'images/3a/7b/3a7b...c9.jpg',
+        'thumbnail': {'webp': [[400, 'images/variants/images/3a/7b/3a7b...c9.jpg/e1/04/e104...5f.webp'], ...],
+                      'jpeg': [...]},
+        'responsive': {'webp': [[480, ...], ...], 'jpeg': [...]},
+    }
+
+Every file is named by its content digest (see storage.py), so variants of
+different images never collide and identical variants are stored once.
+
+Variants are re-encoded from pixels only, so EXIF (GPS position, camera
+serial numbers) never reaches them; orientation is applied first.
+"""
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .fragments import bump_version
+from .models import Auction
+
+THUMBNAIL_SIZES = ((400, 300), (800, 600))
+RESPONSIVE_WIDTHS = (480, 960, 1600)
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+QUALITY = 80
+VARIANTS_DIR = 'images/variants'
+
+PROCESSED = 'processed'
+SKIPPED = 'skipped'
+MISSING = 'missing'
+FAILED = 'failed'
+
+
+def variants_for(auction):
+    """Return the stored variants if they were generated from the auction's current image."""
+    variants = auction.image_variants
+    if auction.image and variants and variants.get('source') == auction.image.name:
+        return variants
+    return None
+
+
+def variant_names(variants):
+    """Every file name referenced by an image_variants mapping."""
+    for key, formats in (variants or {}).items():
+        if key == 'source':
+            continue
+        for entries in formats.values():
+            for _, name in entries:
+                yield name
+
+
+def shared_variants(name):
+    """
+    Variants another auction already generated from the same file. With
+    content-addressed storage, a re-uploaded photo resolves to the same name.
+    """
+    return Auction.objects.filter(image=name, image_variants__source=name).values_list(
+        'image_variants', flat=True,
+    ).first()
+
+
+def touch_variants(storage, variants):
+    """
+    Refresh the modification time of reused variant files, which cleanup_media
+    may have counted as unreferenced already. False if any of them is gone.
+    """
+    try:
+        for name in variant_names(variants):
+            storage.touch(name)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def load_image(field):
+    with field.open('rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, format=FORMATS[fmt], quality=QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def render_variants(image):
+    """Yield (variant_set, width, resized image) for every variant of a decoded image."""
+    for size in THUMBNAIL_SIZES:
+        yield 'thumbnail', size[0], ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    for width in RESPONSIVE_WIDTHS:
+        width = min(width, image.width)
+        height = max(1, round(image.height * width / image.width))
+        yield 'responsive', width, image.resize((width, height), Image.Resampling.LANCZOS)
+        if width == image.width:
+            # Never upscale past the original.
+            break
+
+
+def generate_variants(field):
+    """Write every variant of an image field to its storage and return the image_variants mapping."""
+    storage = field.storage
+    # Grouped under the source's name; the storage names each file by its digest, so nothing is overwritten.
+    directory = posixpath.join(VARIANTS_DIR, field.name)
+    variants = {'source': field.name}
+    for variant_set, width, image in render_variants(load_image(field)):
+        for fmt in FORMATS:
+            name = posixpath.join(directory, f'{variant_set}-{width}.{EXTENSIONS[fmt]}')
+            name = storage.save(name, ContentFile(encode(image, fmt)))
+            variants.setdefault(variant_set, {}).setdefault(fmt, []).append([width, name])
+    return variants
+
+
+def process_auction_image(auction_id, force=False):
+    """Generate and store the variants of one auction's image. Returns a status constant."""
+    auction = Auction.objects.only('image', 'image_variants').filter(pk=auction_id).first()
+    if auction is None or not auction.image:
+        return SKIPPED
+    if not force and variants_for(auction):
+        return SKIPPED
+    variants = None if force else shared_variants(auction.image.name)
+    if variants is not None and not touch_variants(auction.image.storage, variants):
+        variants = None
+    if variants is None:
+        if not auction.image.storage.exists(auction.image.name):
+            return MISSING
+        try:
+            variants = generate_variants(auction.image)
+        except (OSError, Image.DecompressionBombError):
+            return FAILED
+
+    # Only store the variants if the image was not replaced meanwhile.
+    updated = Auction.objects.filter(pk=auction_id, image=auction.image.name).update(image_variants=variants)
+    if updated:
+        bump_version(auction_id)
+    return PROCESSED if updated else SKIPPED
+
+
+def srcset(variants, variant_set, fmt, storage):
+    return ', '.join(f'{storage.url(name)} {width}w' for width, name in variants[variant_set][fmt])
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from auctions.archive import archive_closed_auctions
+
+
+class Command(BaseCommand):
+    help = (
+        'Move bids and comments of auctions closed more than --days ago into the archive tables. '
+        'Runs in batches and can be interrupted and restarted at any point.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--time-limit', type=float, help='Stop starting new batches after this many seconds.')
+
+    def handle(self, *args, **options):
+        auctions, bids, comments = archive_closed_auctions(
+            timedelta(days=options['days']), batch_size=options['batch_size'], time_limit=options['time_limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {auctions} auctions ({bids} bids, {comments} comments).'
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from auctions.models import Auction, Bid
+
+
+class Command(BaseCommand):
+    help = 'Recompute bid_count, leading_bid and last_bid_at for existing auctions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bids = Bid.objects.filter(auction=OuterRef('pk')).order_by()
+        stats = {
+            'bid_count': Coalesce(
+                Subquery(bids.values('auction').annotate(count=Count('pk')).values('count')), 0
+            ),
+            'leading_bid': Subquery(bids.order_by('-amount', '-pk').values('pk')[:1]),
+            'last_bid_at': Subquery(bids.values('auction').annotate(last=Max('created')).values('last')),
+        }
+
+        last_pk = 0
+        updated = 0
+        while True:
+            pks = list(
+                Auction.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                updated += Auction.objects.filter(pk__in=pks).update(**stats)
+            last_pk = pks[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled bid statistics for {updated} auctions.'))
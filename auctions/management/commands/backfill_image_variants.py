@@ -0,0 +1,46 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from auctions.images import process_auction_image
+from auctions.models import Auction
+
+
+def init_worker():
+    # Needed under the spawn start method; a no-op for forked workers.
+    django.setup()
+
+
+def process(args):
+    auction_id, force = args
+    return process_auction_image(auction_id, force=force)
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and responsive image variants for existing auctions across a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist.')
+        parser.add_argument('--chunk-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        auctions = Auction.objects.exclude(image='').order_by('pk')
+        if not options['force']:
+            auctions = auctions.filter(image_variants__isnull=True)
+        jobs = [(pk, options['force']) for pk in auctions.values_list('pk', flat=True)]
+
+        if options['workers'] <= 1:
+            results = Counter(map(process, jobs))
+        else:
+            # Workers must open their own connections rather than share the parent's sockets.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+                results = Counter(pool.map(process, jobs, chunksize=options['chunk_size']))
+
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(results.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Image variants: {summary}.'))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+
+from auctions.models import Auction
+from auctions.pagination import CursorPaginator, encode_cursor
+
+
+class Command(BaseCommand):
+    help = 'Compare the latency of a deep listing page under offset and cursor pagination.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=1000)
+        parser.add_argument('--per-page', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        number, per_page, repeat = options['page'], options['per_page'], options['repeat']
+        queryset = Auction.objects.filter(active=True).order_by(*CursorPaginator.ordering)
+
+        offset = (number - 1) * per_page
+        if offset == 0:
+            cursor = None
+        else:
+            anchor = queryset.values('created', 'pk')[offset - 1:offset].first()
+            if anchor is None:
+                raise CommandError(f'There are fewer than {offset} active auctions; seed more data or lower --page.')
+            cursor = encode_cursor(anchor['created'], anchor['pk'])
+
+        def offset_page():
+            page = Paginator(queryset, per_page).page(number)
+            return list(page.object_list)
+
+        def cursor_page():
+            return list(CursorPaginator(queryset, per_page).page(cursor).object_list)
+
+        offset_rows, cursor_rows = offset_page(), cursor_page()
+        if [a.pk for a in offset_rows] != [a.pk for a in cursor_rows]:
+            raise CommandError('Offset and cursor pagination returned different rows.')
+
+        for name, fetch in (('offset', offset_page), ('cursor', cursor_page)):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fetch()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{name:>6}: page {number} median {timings[len(timings) // 2]:.2f} ms, '
+                f'max {timings[-1]:.2f} ms over {repeat} runs'
+            )
@@ -0,0 +1,59 @@
+import posixpath
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from auctions.images import variant_names
+from auctions.models import Auction
+
+
+def walk(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from walk(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = (
+        'Count references to stored auction images and their variants, and delete files no auction references. '
+        'Files younger than --min-age are kept, so uploads whose auction is not committed yet survive.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='images')
+        parser.add_argument('--min-age', type=int, default=24 * 60 * 60, help='Seconds.')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = Auction._meta.get_field('image').storage
+        references = Counter()
+        rows = Auction.objects.exclude(image='').values_list('image', 'image_variants')
+        for image, variants in rows.iterator(chunk_size=2000):
+            references[image] += 1
+            references.update(variant_names(variants))
+
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+        orphans = freed = 0
+        if storage.exists(options['prefix']):
+            for name in walk(storage, options['prefix']):
+                # Uploads deduplicated onto an old file, and variants reused from another auction, refresh the
+                # modification time (see storage.py and images.py). An auction committed since the references
+                # were counted is caught by checking again before deleting.
+                if references[name] or storage.get_modified_time(name) > cutoff:
+                    continue
+                if Auction.objects.filter(image=name).exists():
+                    continue
+                orphans += 1
+                freed += storage.size(name)
+                if not options['dry_run']:
+                    storage.delete(name)
+
+        shared = sum(1 for count in references.values() if count > 1)
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(references)} referenced files ({shared} shared). {action} {orphans} orphans ({freed} bytes).'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from auctions.closing import close_expired_auctions
+from auctions.tasks import queue_winner_notifications
+
+
+class Command(BaseCommand):
+    help = 'Close auctions past their end time and queue winner notifications, as the beat task does.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        closed = close_expired_auctions(notify=queue_winner_notifications, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Closed {closed} expired auctions.'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.bulk import FORMATS, export_lines
+from auctions.models import Auction, User
+
+
+class Command(BaseCommand):
+    help = 'Stream all auctions, or their bid histories, to a CSV or JSON Lines file (standard output by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('what', choices=['auctions', 'bids'])
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('--author', help='Only auctions by this username.')
+        parser.add_argument('--output', help='File to write instead of standard output.')
+
+    def handle(self, *args, **options):
+        auctions = Auction.objects.all()
+        if options['author']:
+            if not User.objects.filter(username=options['author']).exists():
+                raise CommandError(f'No user named "{options["author"]}".')
+            auctions = auctions.filter(author__username=options['author'])
+
+        lines = export_lines(auctions, options['what'], options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
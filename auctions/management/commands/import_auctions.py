@@ -0,0 +1,43 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.bulk import IMPORT_BATCH_SIZE, UnsupportedFormat, detect_format, import_auctions, open_text, read_rows
+from auctions.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Create auctions from a CSV (with a header row) or JSON Lines file with the columns title, description, '
+        'starting_bid, category (by name), ends_at and optionally image (an already stored file). Valid rows are '
+        'imported even if others are rejected; rejected rows are listed by line number.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--author', required=True, help='Username of the seller.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f'No user named "{options["author"]}".')
+        try:
+            fmt = detect_format(options['path'], options['format'])
+        except UnsupportedFormat as e:
+            raise CommandError(e)
+
+        with open(options['path'], 'rb') as f:
+            try:
+                result = import_auctions(read_rows(open_text(f), fmt), author, options['batch_size'])
+            except (UnicodeDecodeError, csv.Error) as e:
+                raise CommandError(f'Unreadable file (earlier batches were imported): {e}')
+
+        for line_number, errors in result.errors:
+            for field, messages in errors.items():
+                self.stderr.write(f'Line {line_number}: {field}: {" ".join(messages)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} auctions; rejected {len(result.errors)} rows.'
+        ))
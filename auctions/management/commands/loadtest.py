@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand
+
+from auctions.benchmarks import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive a running deployment with concurrent closed-loop clients and report requests per second and '
+        'latency percentiles. Pass several --target URLs (e.g. the WSGI and the ASGI service) to compare them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='Base URL, e.g. http://localhost:8000. May be repeated.')
+        parser.add_argument('--path', action='append',
+                            help='Path to request, cycled by each client. May be repeated. Defaults to /.')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds per target.')
+        parser.add_argument('--timeout', type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        paths = options['path'] or ['/']
+        for target in options['target']:
+            result = self.run_target(
+                target.rstrip('/'), paths, options['concurrency'], options['duration'], options['timeout']
+            )
+            self.stdout.write(
+                f"{target}: {result['requests']} requests, {result['errors']} errors, "
+                f"{result['rps']:.1f} req/s, p50 {result['p50']:.1f} ms, p99 {result['p99']:.1f} ms"
+            )
+
+    def run_target(self, base_url, paths, concurrency, duration, timeout):
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def client(offset):
+            local, failed, i = [], 0, offset
+            while time.monotonic() < deadline:
+                url = base_url + paths[i % len(paths)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    with urlopen(url, timeout=timeout) as response:
+                        response.read()
+                except (URLError, OSError):
+                    failed += 1
+                    continue
+                local.append((time.perf_counter() - start) * 1000)
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(client, range(concurrency)))
+        elapsed = time.monotonic() - started
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors[0],
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': percentile(latencies, 0.50),
+            'p99': percentile(latencies, 0.99),
+        }
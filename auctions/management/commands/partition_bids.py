@@ -0,0 +1,130 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from auctions.models import Auction, Bid, User
+
+TABLE = Bid._meta.db_table
+OLD_TABLE = f'{TABLE}_unpartitioned'
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(value):
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(start):
+    return f'{TABLE}_y{start.year}m{start.month:02d}'
+
+
+class Command(BaseCommand):
+    help = (
+        'PostgreSQL only. Convert the bid table into one range-partitioned by month on created (once), create '
+        'partitions for the coming months, and optionally drop past partitions emptied by archive_auctions. '
+        'Partition keys must be part of the primary key, so the primary key becomes (id, created) and the '
+        'database-level foreign key from Auction.leading_bid is dropped; Django still applies its SET_NULL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--months-ahead', type=int, default=3)
+        parser.add_argument('--drop-empty', action='store_true', help='Drop empty partitions of past months.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Bid partitioning is only supported on PostgreSQL.')
+
+        with transaction.atomic(using=options['database']), connection.cursor() as cursor:
+            self.cursor = cursor
+            if not self.is_partitioned():
+                self.convert()
+            until = timezone.now()
+            for _ in range(options['months_ahead']):
+                until = next_month(until)
+            created = self.create_partitions(month_start(timezone.now()), until)
+            dropped = self.drop_empty_partitions() if options['drop_empty'] else 0
+        self.stdout.write(self.style.SUCCESS(f'Created {created} and dropped {dropped} bid partitions.'))
+
+    def run(self, sql, params=None):
+        self.cursor.execute(sql, params)
+
+    def is_partitioned(self):
+        self.run(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = %s AND pg_table_is_visible(c.oid))',
+            [TABLE],
+        )
+        return self.cursor.fetchone()[0]
+
+    def create_partitions(self, start, until):
+        created = 0
+        while start < until:
+            end = next_month(start)
+            self.run(
+                f'CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {TABLE} '
+                'FOR VALUES FROM (%s) TO (%s)',
+                [start, end],
+            )
+            created += 1
+            start = end
+        return created
+
+    def convert(self):
+        self.stdout.write(f'Converting {TABLE} into a partitioned table...')
+        self.run(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+        self.run(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT LIKE '%%pkey'", [TABLE],
+        )
+        index_definitions = [row[0] for row in self.cursor.fetchall()]
+        self.run('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, 'id'])
+        sequence = self.cursor.fetchone()[0]
+        self.run('SELECT min(created) FROM ' + TABLE)
+        oldest = self.cursor.fetchone()[0] or timezone.now()
+
+        self.run(f'ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}')
+        self.run(f'CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (created)')
+        self.run(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+        self.create_partitions(month_start(oldest), next_month(timezone.now()))
+        self.run(f'INSERT INTO {TABLE} SELECT * FROM {OLD_TABLE}')
+
+        if sequence:
+            self.run(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+        # CASCADE also drops the leading_bid foreign key, which cannot reference a partitioned table's id.
+        self.run(f'DROP TABLE {OLD_TABLE} CASCADE')
+        if sequence:
+            self.run(f'ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id')
+        # Constraint and index names are free again now that the old table is gone. The captured
+        # definitions name the original table, which is now the partitioned one.
+        self.run(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created)')
+        for definition in index_definitions:
+            self.run(definition)
+        for column, target in (('auction_id', Auction._meta.db_table), ('user_id', User._meta.db_table)):
+            self.run(
+                f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_{column}_fk FOREIGN KEY ({column}) '
+                f'REFERENCES {target} (id) DEFERRABLE INITIALLY DEFERRED'
+            )
+
+    def drop_empty_partitions(self):
+        self.run(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s',
+            [TABLE],
+        )
+        current = partition_name(month_start(timezone.now()))
+        dropped = 0
+        for (name,) in self.cursor.fetchall():
+            # Names sort chronologically; keep the current month, future months and the default partition.
+            if not re.fullmatch(rf'{TABLE}_y\d{{4}}m\d{{2}}', name) or name >= current:
+                continue
+            self.run(f'SELECT EXISTS (SELECT 1 FROM {name})')
+            if not self.cursor.fetchone()[0]:
+                self.run(f'DROP TABLE {name}')
+                dropped += 1
+        return dropped
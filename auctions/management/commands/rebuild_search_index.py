@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from auctions.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Create the auction full-text index if needed and rebuild it from the auctions table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(options['database'])
+        backend.install()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index with {type(backend).__name__}.'))
@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.benchmarks import SCENARIOS, BenchmarkError, compare, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the main endpoints through the test client against the current database and export the results as '
+        'JSON. The bid and close scenarios modify data, so run this against a seeded benchmark database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                            help='Scenario to run. May be repeated. Defaults to all.')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--label', help='Free-form name for this run, stored in the JSON.')
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+        parser.add_argument('--compare', help='Print median changes against an earlier JSON report.')
+
+    def handle(self, *args, **options):
+        try:
+            report = run_benchmarks(
+                options['scenario'], options['repeat'], options['warmup'], options['seed'], options['label'],
+            )
+        except BenchmarkError as e:
+            raise CommandError(e)
+
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f"{name:>8}: median {result['median_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, "
+                f"{result['queries']} queries"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            for name, before, after, change in compare(report, baseline):
+                self.stdout.write(f'{name:>8}: {before:.2f} -> {after:.2f} ms ({change:+.1f}%)')
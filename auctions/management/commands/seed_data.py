@@ -0,0 +1,182 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from auctions.models import Auction, Bid, Category, Comment, User
+from auctions.watchlist import Watch
+
+ADJECTIVES = [
+    'Vintage', 'Antique', 'Rare', 'Signed', 'Handmade', 'Restored', 'Mint', 'Classic', 'Limited', 'Original',
+    'Used', 'Refurbished', 'Collectible', 'Boxed', 'Custom', 'Retro', 'Sealed', 'Unused', 'Large', 'Compact',
+]
+NOUNS = [
+    'camera', 'guitar', 'watch', 'lamp', 'bicycle', 'record', 'typewriter', 'desk', 'chair', 'painting',
+    'vase', 'novel', 'radio', 'jacket', 'telescope', 'clock', 'mirror', 'rug', 'kettle', 'console',
+]
+CATEGORIES = [
+    'Antiques', 'Art', 'Books', 'Cameras', 'Clothing', 'Collectibles', 'Computers', 'Electronics', 'Furniture',
+    'Garden', 'Jewellery', 'Music', 'Musical Instruments', 'Sports', 'Stamps', 'Toys', 'Video Games', 'Watches',
+]
+WORDS = (
+    'condition excellent minor wear original box manual included works perfectly shipped insured collector '
+    'piece tested cleaned serviced scratches pickup available smoke free home rare find great gift'
+).split()
+
+SEED_PASSWORD = 'seed-password'
+MAX_AMOUNT = Decimal('99999.99')
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill an empty database with a reproducible synthetic dataset (users, categories, auctions, bids, comments '
+        f'and watchlists) for benchmarking. Seeded users are named userNNNNNN with the password "{SEED_PASSWORD}".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--categories', type=int, default=len(CATEGORIES))
+        parser.add_argument('--auctions', type=int, default=200_000)
+        parser.add_argument('--bids', type=int, default=2_000_000, help='Approximate total.')
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--watches', type=int, default=300_000, help='Approximate total.')
+        parser.add_argument('--closed-ratio', type=float, default=0.2)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith='user').exists():
+            raise CommandError('Seeded users already exist; run this on a fresh database.')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.auction_ids = []
+
+        user_ids = self.create_users(options['users'])
+        category_ids = self.create_categories(options['categories'])
+        auctions = bids = 0
+        mean_bids = options['bids'] / max(options['auctions'], 1)
+        for start in range(0, options['auctions'], self.batch_size):
+            size = min(self.batch_size, options['auctions'] - start)
+            with transaction.atomic():
+                created, bid_total = self.create_auctions(
+                    size, user_ids, category_ids, mean_bids, options['closed_ratio'],
+                )
+            auctions += created
+            bids += bid_total
+            self.stdout.write(f'{auctions} auctions, {bids} bids', ending='\r')
+        self.stdout.write('')
+
+        call_command('backfill_bid_stats', batch_size=self.batch_size, stdout=self.stdout)
+        comments = self.create_comments(options['comments'], user_ids)
+        watches = self.create_watches(options['watches'], user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(user_ids)} users, {len(category_ids)} categories, {auctions} auctions, {bids} bids, '
+            f'{comments} comments and {watches} watches (seed {options["seed"]}).'
+        ))
+
+    def bulk_create(self, model, objects):
+        """bulk_create in batch_size chunks, keeping one chunk in memory at a time; returns the number created."""
+        created = 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                created += len(model.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(model.objects.bulk_create(batch))
+        return created
+
+    def past(self, days=365):
+        return self.now - timedelta(seconds=self.rng.randrange(days * 24 * 60 * 60))
+
+    def create_users(self, count):
+        password = make_password(SEED_PASSWORD)
+        # Every auction, bid and comment picks from the user ids, so these are the only rows kept around.
+        users = User.objects.bulk_create((
+            User(username=f'user{i:06d}', email=f'user{i:06d}@example.com', password=password,
+                 date_joined=self.past(730))
+            for i in range(count)
+        ), batch_size=self.batch_size)
+        return [user.pk for user in users]
+
+    def create_categories(self, count):
+        names = [
+            CATEGORIES[i] if i < len(CATEGORIES) else f'{CATEGORIES[i % len(CATEGORIES)]} {i // len(CATEGORIES)}'
+            for i in range(count)
+        ]
+        existing = set(Category.objects.filter(category_name__in=names).values_list('category_name', flat=True))
+        Category.objects.bulk_create(Category(category_name=name) for name in names if name not in existing)
+        return list(Category.objects.filter(category_name__in=names).values_list('pk', flat=True))
+
+    def create_auctions(self, count, user_ids, category_ids, mean_bids, closed_ratio):
+        rng = self.rng
+        auctions, planned_bids = [], []
+        for _ in range(count):
+            created = self.past()
+            starting_bid = Decimal(rng.randrange(100, 50000)) / 100
+            author = rng.choice(user_ids)
+            bidders = [pk for pk in rng.sample(user_ids, min(len(user_ids), 6)) if pk != author][:5]
+            # Bid counts are skewed: most auctions get a few bids, a handful get many.
+            amounts, amount, when = [], starting_bid, created
+            for _ in range(int(rng.expovariate(1 / mean_bids)) if mean_bids and bidders else 0):
+                amount = min(MAX_AMOUNT, (amount * (100 + rng.randrange(1, 10)) / 100).quantize(Decimal('.01')))
+                when = min(self.now, when + timedelta(minutes=rng.randrange(1, 600)))
+                amounts.append((rng.choice(bidders), amount, when))
+            closed = rng.random() < closed_ratio
+            auctions.append(Auction(
+                title=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}',
+                description=' '.join(rng.choices(WORDS, k=rng.randrange(8, 40))).capitalize() + '.',
+                author_id=author,
+                starting_bid=starting_bid,
+                current_bid=amounts[-1][1] if amounts else None,
+                image='',
+                category_id=rng.choice(category_ids),
+                active=not closed,
+                created=created,
+                ends_at=None if closed else self.now + timedelta(hours=rng.randrange(1, 24 * 14)),
+                # Closed at the last bid (or when listed), so archive_auctions has old auctions to move.
+                closed_at=(amounts[-1][2] if amounts else created) if closed else None,
+                buyer_id=amounts[-1][0] if closed and amounts else None,
+            ))
+            planned_bids.append(amounts)
+
+        auctions = Auction.objects.bulk_create(auctions)
+        self.auction_ids += [auction.pk for auction in auctions]
+        bids = self.bulk_create(Bid, (
+            Bid(auction_id=auction.pk, user_id=user_id, amount=amount, created=when)
+            for auction, amounts in zip(auctions, planned_bids)
+            for user_id, amount, when in amounts
+        ))
+        return len(auctions), bids
+
+    def create_comments(self, count, user_ids):
+        if not self.auction_ids:
+            return 0
+        rng = self.rng
+        return self.bulk_create(Comment, (
+            Comment(
+                auction_id=rng.choice(self.auction_ids), user_id=rng.choice(user_ids),
+                comment=' '.join(rng.choices(WORDS, k=rng.randrange(3, 25))).capitalize() + '.',
+            )
+            for _ in range(count)
+        ))
+
+    def create_watches(self, count, user_ids):
+        if not self.auction_ids:
+            return 0
+        rng = self.rng
+        before = Watch.objects.count()
+        for start in range(0, count, self.batch_size):
+            Watch.objects.bulk_create(
+                [Watch(auction_id=rng.choice(self.auction_ids), user_id=rng.choice(user_ids))
+                 for _ in range(min(self.batch_size, count - start))],
+                ignore_conflicts=True,
+            )
+        return Watch.objects.count() - before
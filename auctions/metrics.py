@@ -0,0 +1,298 @@
+"""
+In-process request metrics exposed in the Prometheus text format.
+
+MetricsMiddleware records, per resolved view name:
+
+- request latency (every request),
+- ORM query count and total query time (sampled),
+- template render time (sampled).
+
+MeteredCache counts cache hits and misses. Everything lives in one
+MetricsRegistry per process; with several gunicorn workers each worker
+serves its own numbers, so scrape every worker (or run one per container).
+
+Settings:
+
+- AUCTIONS_METRICS_SAMPLE_RATE: fraction of requests that get query and
+  template instrumentation (default 1.0).
+- AUCTIONS_SLOW_REQUEST_SECONDS: log sampled requests slower than this, with
+  their SQL, to the auctions.slow_requests logger (default None: off).
+- AUCTIONS_METRICS_TOKEN: if set, /metrics requires
+  "Authorization: Bearer <token>".
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+slow_request_logger = logging.getLogger('auctions.slow_requests')
+
+
+class Histogram:
+    """Cumulative-bucket histogram; not locked itself, the registry serialises updates."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (metric name, label pairs), guarded by one lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            self._help = {}
+
+    def record(self, counters=(), histograms=()):
+        """
+        Apply several updates under one lock acquisition. counters are
+        (name, labels, amount) and histograms (name, labels, buckets, value).
+        """
+        with self._lock:
+            for name, labels, amount in counters:
+                key = (name, tuple(labels))
+                self._counters[key] = self._counters.get(key, 0) + amount
+            for name, labels, buckets, value in histograms:
+                key = (name, tuple(labels))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(buckets)
+                histogram.observe(value)
+
+    def inc(self, name, labels=(), amount=1):
+        self.record(counters=[(name, labels, amount)])
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def value(self, name, labels=()):
+        with self._lock:
+            return self._counters.get((name, tuple(labels)), 0)
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, list(h.buckets), list(h.counts), h.sum) for key, h in self._histograms.items()
+            )
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f'{name}{format_labels(labels)} {value}')
+        for (name, labels), buckets, counts, total in histograms:
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+registry.describe('auctions_requests_total', 'Requests by view, method and status code.')
+registry.describe('auctions_request_duration_seconds', 'Request latency by view.')
+registry.describe('auctions_db_queries', 'ORM queries per sampled request.')
+registry.describe('auctions_db_query_duration_seconds', 'Total ORM query time per sampled request.')
+registry.describe('auctions_template_render_seconds', 'Template rendering time per sampled request.')
+registry.describe('auctions_slow_requests_total', 'Sampled requests over AUCTIONS_SLOW_REQUEST_SECONDS.')
+registry.describe('auctions_cache_requests_total', 'Cache lookups by result (hit or miss).')
+
+
+class QueryRecorder:
+    """connection.execute_wrapper that counts and times queries, optionally keeping the SQL."""
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_sql = keep_sql
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if self.keep_sql:
+                self.queries.append((elapsed, sql))
+
+
+class MetricsMiddleware:
+    """
+    Records request metrics into the process registry. Place it first in
+    MIDDLEWARE. Under ASGI it stays async, so the chain below it is not
+    pushed into a worker thread, and the registry update runs off the event
+    loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = self.start(request)
+        start = time.perf_counter()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = self.start(request)
+        start = time.perf_counter()
+        # Sync views and ORM calls run in the thread-sensitive executor, on that thread's connections.
+        recording = self.recording(recorder)
+        await sync_to_async(recording.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.__exit__)(None, None, None)
+        await sync_to_async(self.record, thread_sensitive=False)(
+            request, response, time.perf_counter() - start, recorder,
+        )
+        return response
+
+    @staticmethod
+    def start(request):
+        """A QueryRecorder if the request is sampled, otherwise None."""
+        sample_rate = getattr(settings, 'AUCTIONS_METRICS_SAMPLE_RATE', 1.0)
+        slow_seconds = getattr(settings, 'AUCTIONS_SLOW_REQUEST_SECONDS', None)
+        request._metrics_template_seconds = 0.0
+        if sample_rate >= 1 or random.random() < sample_rate:
+            return QueryRecorder(keep_sql=slow_seconds is not None)
+        return None
+
+    @staticmethod
+    @contextmanager
+    def recording(recorder):
+        with ExitStack() as stack:
+            if recorder is not None:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+            yield
+
+    def record(self, request, response, duration, recorder):
+        slow_seconds = getattr(settings, 'AUCTIONS_SLOW_REQUEST_SECONDS', None)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        counters = [('auctions_requests_total', (('view', view), ('method', request.method),
+                                                 ('status', response.status_code)), 1)]
+        histograms = [('auctions_request_duration_seconds', (('view', view),), LATENCY_BUCKETS, duration)]
+        if recorder is not None:
+            histograms += [
+                ('auctions_db_queries', (('view', view),), QUERY_COUNT_BUCKETS, recorder.count),
+                ('auctions_db_query_duration_seconds', (('view', view),), LATENCY_BUCKETS, recorder.duration),
+                ('auctions_template_render_seconds', (('view', view),), LATENCY_BUCKETS,
+                 request._metrics_template_seconds),
+            ]
+            if slow_seconds is not None and duration >= slow_seconds:
+                counters.append(('auctions_slow_requests_total', (('view', view),), 1))
+                self.log_slow_request(request, view, duration, recorder)
+        registry.record(counters, histograms)
+
+    def process_template_response(self, request, response):
+        render = response.render
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request._metrics_template_seconds += time.perf_counter() - start
+
+        response.render = timed_render
+        return response
+
+    @staticmethod
+    def log_slow_request(request, view, duration, recorder):
+        statements = '\n'.join(f'  {elapsed * 1000:.1f} ms  {sql}' for elapsed, sql in recorder.queries)
+        slow_request_logger.warning(
+            'Slow request %s %s (%s) took %.3f s with %d queries (%.3f s in SQL)\n%s',
+            request.method, request.get_full_path(), view, duration, recorder.count, recorder.duration, statements,
+        )
+
+
+class MeteredCache:
+    """
+    Cache backend that wraps OPTIONS['BACKEND'] and counts hits and misses of
+    get() and get_many(); everything else is delegated unchanged.
+    """
+
+    _missing = object()
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        backend = options.pop('BACKEND')
+        params['OPTIONS'] = options
+        self._cache = import_string(backend)(location, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, self._missing, version=version)
+        hit = value is not self._missing
+        registry.inc('auctions_cache_requests_total', (('result', 'hit' if hit else 'miss'),))
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._cache.get_many(keys, version=version)
+        registry.record(counters=[
+            ('auctions_cache_requests_total', (('result', 'hit'),), len(found)),
+            ('auctions_cache_requests_total', (('result', 'miss'),), len(keys) - len(found)),
+        ])
+        return found
@@ -0,0 +1,62 @@
+# Generated by Django 4.1 on 2026-10-18 20:23
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_categories(apps, schema_editor):
+    # category_name becomes unique below, so fold each set of duplicates into its oldest category.
+    db = schema_editor.connection.alias
+    Auction = apps.get_model('auctions', 'Auction')
+    Category = apps.get_model('auctions', 'Category')
+    duplicates = list(
+        Category.objects.using(db).order_by().values('category_name')
+        .annotate(keep=Min('pk'), count=Count('pk')).filter(count__gt=1)
+    )
+    for row in duplicates:
+        others = Category.objects.using(db).filter(category_name=row['category_name']).exclude(pk=row['keep'])
+        Auction.objects.using(db).filter(category__in=others).update(category_id=row['keep'])
+        others.delete()
+    if duplicates and schema_editor.connection.vendor == 'postgresql':
+        # Run the deferred foreign key checks now; pending ones would block the AlterField.
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0002_bid_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_categories, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='category',
+            name='category_name',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-created', '-id'], name='auction_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('active', True)), fields=['category', '-created', '-id'], name='auction_category_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['buyer', '-created'], name='auction_buyer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-bid_count', '-created', '-id'], name='auction_active_bids_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['auction', '-amount'], name='bid_auction_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['auction', 'active', 'created'], name='comment_auction_created_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from auctions.search import get_search_backend
+
+    backend = get_search_backend(schema_editor.connection.alias)
+    backend.install()
+    backend.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0003_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1 on 2026-10-18 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='winner_notified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
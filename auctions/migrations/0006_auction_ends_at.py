@@ -0,0 +1,22 @@
+# Generated by Django 4.1 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0005_winner_notified_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('active', True)), fields=['ends_at'], name='auction_active_ends_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1 on 2026-10-18 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0006_auction_ends_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+import auctions.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Storage has no database representation; a plain AlterField would make
+    SQLite rebuild auctions_auction and drop the full-text index triggers.
+    """
+
+    dependencies = [
+        ('auctions', '0007_auction_image_variants'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='auction',
+                    name='image',
+                    field=models.ImageField(storage=auctions.storage.image_storage, upload_to='images/'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.1 on 2026-10-18 20:53
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_closed_at(apps, schema_editor):
+    # Closed auctions predate closed_at; their end time or last bid is the best estimate.
+    Auction = apps.get_model('auctions', 'Auction')
+    Auction.objects.using(schema_editor.connection.alias).filter(active=False, closed_at__isnull=True).update(
+        closed_at=Least(Coalesce('ends_at', 'last_bid_at', 'created'), models.Value(timezone.now())),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0008_auction_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBid',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('created', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('comment', models.TextField()),
+                ('created', models.DateTimeField()),
+                ('active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('active', False), ('archived_at__isnull', True)), fields=['closed_at'], name='auction_archivable_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='auction',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_comments', to='auctions.auction'),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedbid',
+            name='auction',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bids', to='auctions.auction'),
+        ),
+        migrations.AddField(
+            model_name='archivedbid',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['auction', 'active', 'created'], name='archived_comment_auction_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbid',
+            index=models.Index(fields=['auction', '-amount'], name='archived_bid_auction_idx'),
+        ),
+        migrations.RunPython(backfill_closed_at, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,8 @@ from django.db import models
 from django.urls import reverse
 from django.utils import timezone
 
+from .storage import image_storage
+
 
 class User(AbstractUser):
     def __str__(self):
@@ -11,7 +13,7 @@ class User(AbstractUser):
 
 
 class Category(models.Model):
-    category_name = models.CharField(max_length=50, db_index=True)
+    category_name = models.CharField(max_length=50, unique=True)
     objects = models.Manager
 
     def __str__(self):
@@ -28,14 +30,53 @@ class Auction(models.Model):
     starting_bid = models.DecimalField(max_digits=7, decimal_places=2, validators=[MinValueValidator(0.01)])
     current_bid = models.DecimalField(max_digits=7, decimal_places=2, validators=[MinValueValidator(0.01)],
                                       blank=True, null=True)
-    image = models.ImageField(upload_to='images/')
+    image = models.ImageField(upload_to='images/', storage=image_storage)
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='categories')
     active = models.BooleanField(default=True)
     created = models.DateTimeField(default=timezone.now)
+    ends_at = models.DateTimeField(null=True, blank=True)
     watchers = models.ManyToManyField(User, related_name='watchlist', blank=True)
     buyer = models.ForeignKey(User, on_delete=models.PROTECT, null=True)
+    bid_count = models.PositiveIntegerField(default=0)
+    leading_bid = models.ForeignKey('Bid', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_bid_at = models.DateTimeField(null=True, blank=True)
+    winner_notified_at = models.DateTimeField(null=True, blank=True, editable=False)
+    closed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    archived_at = models.DateTimeField(null=True, blank=True, editable=False)
     objects = models.Manager
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-created', '-id'], condition=models.Q(active=True), name='auction_active_created_idx',
+            ),
+            models.Index(
+                fields=['category', '-created', '-id'], condition=models.Q(active=True),
+                name='auction_category_active_idx',
+            ),
+            models.Index(fields=['buyer', '-created'], name='auction_buyer_created_idx'),
+            models.Index(
+                fields=['-bid_count', '-created', '-id'], condition=models.Q(active=True),
+                name='auction_active_bids_idx',
+            ),
+            models.Index(fields=['ends_at'], condition=models.Q(active=True), name='auction_active_ends_at_idx'),
+            models.Index(
+                fields=['closed_at'], condition=models.Q(active=False, archived_at__isnull=True),
+                name='auction_archivable_idx',
+            ),
+        ]
+
+    # Fields whose loaded values post_save receivers compare against (see signals.py).
+    tracked_fields = ('image', 'active')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {name: instance.__dict__[name] for name in cls.tracked_fields
+                                   if name in instance.__dict__}
+        return instance
+
     def __str__(self):
         return f'Auction "{self.title}" by {self.author}'
 
@@ -47,8 +88,14 @@ class Bid(models.Model):
     auction = models.ForeignKey(Auction, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=7, decimal_places=2)
+    created = models.DateTimeField(default=timezone.now)
     objects = models.Manager
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['auction', '-amount'], name='bid_auction_amount_idx'),
+        ]
+
     def __str__(self):
         return f'Bid {self.amount} on {self.auction.title} by {self.user.username}'
 
@@ -61,5 +108,47 @@ class Comment(models.Model):
     active = models.BooleanField(default=True)
     objects = models.Manager
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['auction', 'active', 'created'], name='comment_auction_created_idx'),
+        ]
+
     def __str__(self):
         return f'Comment by {self.user} on {self.auction}'
+
+
+class ArchivedBid(models.Model):
+    """A bid of an archived auction, moved out of Bid with its original id (see auctions/archive.py)."""
+    id = models.IntegerField(primary_key=True)
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='archived_bids')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    amount = models.DecimalField(max_digits=7, decimal_places=2)
+    created = models.DateTimeField()
+    objects = models.Manager
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['auction', '-amount'], name='archived_bid_auction_idx'),
+        ]
+
+    def __str__(self):
+        return f'Archived bid {self.amount} on auction {self.auction_id}'
+
+
+class ArchivedComment(models.Model):
+    """A comment of an archived auction, moved out of Comment with its original id."""
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='archived_comments')
+    comment = models.TextField()
+    created = models.DateTimeField()
+    active = models.BooleanField(default=True)
+    objects = models.Manager
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['auction', 'active', 'created'], name='archived_comment_auction_idx'),
+        ]
+
+    def __str__(self):
+        return f'Archived comment by user {self.user_id} on auction {self.auction_id}'
@@ -0,0 +1,154 @@
+"""
+N+1 query detection.
+
+NPlusOneDetector is a connection.execute_wrapper that groups queries by
+shape (the SQL with literals and IN lists collapsed) and by call site: the
+innermost project frame and, when the query comes out of template
+rendering, the template line being rendered. The same shape repeated from
+the same site within one request is the signature of a per-row lazy load.
+
+NPlusOneMiddleware runs the detector on every request when
+AUCTIONS_NPLUSONE is 'log' (staging: warn on the auctions.nplusone logger)
+or 'raise' (tests: fail the request). The setting is read when the
+middleware chain is built; when it is unset the middleware drops out of the
+chain, so production pays nothing per request. AUCTIONS_NPLUSONE_THRESHOLD
+is the number of repeats that counts as N+1.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+DEFAULT_THRESHOLD = 5
+
+logger = logging.getLogger('auctions.nplusone')
+
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def query_shape(sql):
+    sql = _IN_LIST.sub('(%s, ...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _is_project_file(filename):
+    base_dir = str(getattr(settings, 'BASE_DIR', ''))
+    return (
+        bool(base_dir) and filename.startswith(base_dir) and filename != __file__
+        and f'{os.sep}site-packages{os.sep}' not in filename
+    )
+
+
+def call_site():
+    """Describe where the current query comes from: project code and/or template line."""
+    code_site = template_site = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == '_execute_with_wrappers':
+            # Everything inside is an execute_wrapper (this detector, request metrics), not the caller.
+            code_site = None
+        elif code.co_name == 'render_annotated' and 'self' in frame.f_locals:
+            node = frame.f_locals['self']
+            origin, token = getattr(node, 'origin', None), getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template_site = f'template {origin.template_name or origin.name}, line {token.lineno}'
+                break
+        if code_site is None and _is_project_file(code.co_filename):
+            filename = os.path.relpath(code.co_filename, str(settings.BASE_DIR))
+            code_site = f'{filename}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return ' via '.join(site for site in (code_site, template_site) if site) or 'unknown'
+
+
+class NPlusOneDetector:
+    def __init__(self, threshold=None):
+        if threshold is None:
+            threshold = getattr(settings, 'AUCTIONS_NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD)
+        self.threshold = threshold
+        self.counts = Counter()
+        self.examples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        key = (query_shape(sql), call_site())
+        self.counts[key] += 1
+        self.examples.setdefault(key, sql)
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def capture(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def violations(self):
+        """(count, call site, example SQL) for every shape repeated at least threshold times, worst first."""
+        return sorted(
+            ((count, site, self.examples[(shape, site)])
+             for (shape, site), count in self.counts.items() if count >= self.threshold),
+            reverse=True,
+        )
+
+    def report(self):
+        return '\n'.join(
+            f'{count} similar queries from {site}:\n    {sql}' for count, site, sql in self.violations()
+        )
+
+
+class NPlusOneMiddleware:
+    """Runs NPlusOneDetector per request according to AUCTIONS_NPLUSONE ('log', 'raise' or unset)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, 'AUCTIONS_NPLUSONE', None)
+        if self.mode not in ('log', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        detector = NPlusOneDetector()
+        with detector.capture():
+            response = self.get_response(request)
+        self.check(request, detector)
+        return response
+
+    async def __acall__(self, request):
+        detector = NPlusOneDetector()
+        # Sync views and ORM calls run in the thread-sensitive executor, on that thread's connections.
+        capture = detector.capture()
+        await sync_to_async(capture.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(capture.__exit__)(None, None, None)
+        self.check(request, detector)
+        return response
+
+    def check(self, request, detector):
+        if detector.violations():
+            message = f'N+1 queries in {request.method} {request.path}:\n{detector.report()}'
+            if self.mode == 'raise':
+                raise NPlusOneError(message)
+            logger.warning(message)
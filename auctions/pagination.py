@@ -0,0 +1,158 @@
+import base64
+import json
+
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+# Below this many rows an exact COUNT(*) is cheap and preferable to an estimate.
+ESTIMATE_THRESHOLD = 10000
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(created, pk, reverse=False):
+    payload = json.dumps([created.isoformat(), pk, int(reverse)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created, pk, reverse) for a token made by encode_cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created, pk, reverse = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created = parse_datetime(created)
+        if created is None or not isinstance(pk, int):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    return created, pk, bool(reverse)
+
+
+class CursorPage:
+    """One page of a CursorPaginator, with opaque tokens for its neighbours."""
+    is_cursor_page = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor, paginator):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.paginator = paginator
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over a queryset ordered by (created, id), newest first by
+    default or oldest first with ordering=('created', 'id').
+
+    Each page is a single indexed range query for per_page + 1 rows, so deep
+    pages cost the same as the first one and no COUNT(*) is issued.
+    """
+    ordering = ('-created', '-id')
+
+    def __init__(self, queryset, per_page, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if self.ordering not in (('-created', '-id'), ('created', 'id')):
+            raise ValueError(f'Unsupported cursor ordering: {self.ordering}')
+        self.queryset = queryset
+        self.per_page = per_page
+        self.descending = self.ordering[0].startswith('-')
+
+    def page_queryset(self, cursor=None):
+        """Return the range query for the page after (or before) the cursor, and whether it runs backwards."""
+        queryset = self.queryset.order_by(*self.ordering)
+        if not cursor:
+            return queryset, False
+
+        created, pk, reverse = decode_cursor(cursor)
+        if self.descending != reverse:
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, id__lt=pk), created__lte=created
+            ).order_by('-created', '-id')
+        else:
+            queryset = queryset.filter(
+                Q(created__gt=created) | Q(created=created, id__gt=pk), created__gte=created
+            ).order_by('created', 'id')
+        return queryset, reverse
+
+    def page(self, cursor=None):
+        queryset, reverse = self.page_queryset(cursor)
+        return self.build_page(list(queryset[:self.per_page + 1]), cursor, reverse)
+
+    async def apage(self, cursor=None):
+        queryset, reverse = self.page_queryset(cursor)
+        return self.build_page([row async for row in queryset[:self.per_page + 1]], cursor, reverse)
+
+    def build_page(self, rows, cursor, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        has_next = has_more if not reverse else True
+        has_previous = bool(cursor) if not reverse else has_more
+        next_cursor = encode_cursor(rows[-1].created, rows[-1].pk) if rows and has_next else None
+        previous_cursor = encode_cursor(rows[0].created, rows[0].pk, reverse=True) if rows and has_previous else None
+        return CursorPage(rows, next_cursor, previous_cursor, self)
+
+
+def estimated_count(model, using='default'):
+    """
+    The planner's row estimate for a model's table: pg_class.reltuples on
+    PostgreSQL, sqlite_stat1 on SQLite (both refreshed by ANALYZE). None if
+    there is no estimate.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            elif connection.vendor == 'sqlite':
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+            else:
+                return None
+            rows = cursor.fetchall()
+    except DatabaseError:
+        # sqlite_stat1 only exists once ANALYZE has run.
+        return None
+    if connection.vendor == 'sqlite':
+        counts = [int(stat.split()[0]) for stat, in rows if stat]
+        return max(counts) if counts else None
+    return rows[0][0] if rows and rows[0][0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that trusts the planner's estimate instead of COUNT(*) for an
+    unfiltered queryset over a large table. Filtered querysets are counted.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and not query.distinct:
+            estimate = estimated_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
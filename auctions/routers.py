@@ -0,0 +1,154 @@
+"""
+Primary/replica database routing.
+
+Reads go to the primary unless ReplicaMiddleware has opted the current
+request in: a GET or HEAD to one of the read-only pages named in
+AUCTIONS_REPLICA_VIEWS (index, category, search, auction detail). Bids,
+closes, Celery tasks and management commands therefore always see the
+primary.
+
+Replicas lag behind the primary, so a user who has just written something
+should read it back from the primary. Any write during a request sets a
+cookie that keeps the user's reads on the primary for
+AUCTIONS_REPLICA_PIN_SECONDS.
+
+A replica that cannot be connected to is skipped for
+AUCTIONS_REPLICA_RETRY_SECONDS; when none is usable reads fall back to the
+primary.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = 'auctions_primary'
+
+# Set for the duration of a request that may read from a replica.
+_request_state = ContextVar('auctions_replica_request', default=None)
+_replica_down_until = {}
+
+
+class RequestState:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def replica_aliases():
+    return [alias for alias in settings.AUCTIONS_READ_REPLICAS if alias in connections]
+
+
+def mark_down(alias):
+    _replica_down_until[alias] = time.monotonic() + settings.AUCTIONS_REPLICA_RETRY_SECONDS
+
+
+def is_available(alias):
+    if _replica_down_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        # A no-op while the persistent connection is open; CONN_HEALTH_CHECKS
+        # drops a broken one at the start of each request.
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        mark_down(alias)
+        return False
+    return True
+
+
+def choose_replica():
+    candidates = replica_aliases()
+    random.shuffle(candidates)
+    return next((alias for alias in candidates if is_available(alias)), None)
+
+
+class PrimaryReplicaRouter:
+    """Routes opted-in reads of the auctions app to a replica and everything else to the primary."""
+    app_label = 'auctions'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != self.app_label:
+            return None
+        state = _request_state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return DEFAULT_DB_ALIAS
+        return choose_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        aliases = {DEFAULT_DB_ALIAS, *settings.AUCTIONS_READ_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from the primary.
+        return db not in settings.AUCTIONS_READ_REPLICAS
+
+
+class ReplicaMiddleware:
+    """
+    Opts read-only pages into replica reads and pins recent writers to the
+    primary. Under ASGI it stays async and sets the request state in the
+    request's own context, which sync_to_async carries into sync views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django would otherwise run the sync hook in a thread, on a copy of the context.
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RequestState(use_replica=False)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state = RequestState(use_replica=False)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(state, response)
+
+    @staticmethod
+    def pin(state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.AUCTIONS_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _request_state.get().use_replica = self.may_use_replica(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        _request_state.get().use_replica = self.may_use_replica(request)
+
+    @staticmethod
+    def may_use_replica(request):
+        return (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.url_name in settings.AUCTIONS_REPLICA_VIEWS
+            and PIN_COOKIE not in request.COOKIES
+            and bool(settings.AUCTIONS_READ_REPLICAS)
+        )
@@ -0,0 +1,165 @@
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Auction
+
+MAX_TERMS = 8
+
+
+def get_terms(query):
+    """Split a user query into at most MAX_TERMS plain word tokens."""
+    return re.findall(r'\w+', query or '')[:MAX_TERMS]
+
+
+class BaseSearchBackend:
+    """
+    Full-text search over auction titles and descriptions.
+
+    search() returns a queryset of Auction ordered best match first, so it can
+    be paginated like any other listing. Every term is matched as a prefix.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def install(self):
+        """Create the index structures. Safe to run more than once."""
+
+    def rebuild(self):
+        """Rebuild the index from the auctions table."""
+
+    def search(self, query, queryset=None):
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    FTS5 external-content table kept in sync with auctions_auction by triggers.
+    SQLite drops the triggers when a migration rebuilds auctions_auction, so
+    rebuild_search_index must run after such migrations.
+    """
+    table = 'auctions_auction_fts'
+    title_weight = 10.0
+    description_weight = 1.0
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                f"title, description, content='auctions_auction', content_rowid='id')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_ai AFTER INSERT ON auctions_auction BEGIN "
+                f"INSERT INTO {self.table}(rowid, title, description) VALUES (new.id, new.title, new.description); "
+                f"END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_ad AFTER DELETE ON auctions_auction BEGIN "
+                f"INSERT INTO {self.table}({self.table}, rowid, title, description) "
+                f"VALUES ('delete', old.id, old.title, old.description); "
+                f"END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_au AFTER UPDATE OF title, description "
+                f"ON auctions_auction BEGIN "
+                f"INSERT INTO {self.table}({self.table}, rowid, title, description) "
+                f"VALUES ('delete', old.id, old.title, old.description); "
+                f"INSERT INTO {self.table}(rowid, title, description) VALUES (new.id, new.title, new.description); "
+                f"END"
+            )
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+    def search(self, query, queryset=None):
+        queryset = Auction.objects.all() if queryset is None else queryset
+        terms = get_terms(query)
+        if not terms:
+            return queryset.none()
+
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            tables=[self.table],
+            select={'rank': f'bm25({self.table}, {self.title_weight}, {self.description_weight})'},
+            where=[f'{self.table}.rowid = auctions_auction.id', f'{self.table} MATCH %s'],
+            params=[expression],
+        ).order_by('rank', '-created', '-id')
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Weighted tsvector generated column with a GIN index."""
+    config = 'english'
+    index_name = 'auction_search_vector_idx'
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "ALTER TABLE auctions_auction ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                "GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('{self.config}', coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector('{self.config}', coalesce(description, '')), 'B')"
+                ") STORED"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.index_name} ON auctions_auction USING GIN (search_vector)"
+            )
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {self.index_name}')
+
+    def search(self, query, queryset=None):
+        queryset = Auction.objects.all() if queryset is None else queryset
+        terms = get_terms(query)
+        if not terms:
+            return queryset.none()
+
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.extra(
+            select={'rank': f"ts_rank(search_vector, to_tsquery('{self.config}', %s))"},
+            select_params=[tsquery],
+            where=[f"search_vector @@ to_tsquery('{self.config}', %s)"],
+            params=[tsquery],
+        ).order_by('-rank', '-created', '-id')
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unranked icontains fallback for databases without a full-text backend."""
+
+    def search(self, query, queryset=None):
+        queryset = Auction.objects.all() if queryset is None else queryset
+        terms = get_terms(query)
+        if not terms:
+            return queryset.none()
+
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return queryset.order_by('-created', '-id')
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using=DEFAULT_DB_ALIAS):
+    """
+    Return the search backend for a database, either the dotted path in the
+    AUCTIONS_SEARCH_BACKEND setting or the default for the database vendor.
+    """
+    backend_path = getattr(settings, 'AUCTIONS_SEARCH_BACKEND', None)
+    if backend_path:
+        backend_class = import_string(backend_path)
+    else:
+        backend_class = VENDOR_BACKENDS.get(connections[using].vendor, SimpleSearchBackend)
+    return backend_class(using)
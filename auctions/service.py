@@ -1,12 +1,58 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
 from auctions.config import my_email
+from auctions.models import Auction
 
 
-def send(user_email):
-    send_mail(
+def build_winner_message(auction, connection=None):
+    return EmailMessage(
         'Congratulations!',
-        'Your bid was the winning one.',
+        f'Your bid of ${auction.current_bid} on "{auction.title}" was the winning one.',
         my_email,
-        [user_email],
-        fail_silently=False,
+        [auction.buyer.email],
+        connection=connection,
     )
+
+
+def claim_winner_notifications(auction_ids):
+    """
+    Mark the auctions as notified and return the ones this call claimed. The
+    auction id is the idempotency key: one conditional UPDATE claims every
+    unnotified winner at once, so each winner is claimed by exactly one
+    caller however often the task is delivered. The claim time identifies
+    this caller's rows.
+    """
+    now = timezone.now()
+    candidates = Auction.objects.filter(
+        pk__in=auction_ids, active=False, buyer__isnull=False, winner_notified_at__isnull=True
+    ).exclude(buyer__email='')
+    if not candidates.update(winner_notified_at=now):
+        return []
+    return list(Auction.objects.filter(pk__in=auction_ids, winner_notified_at=now).values_list('pk', flat=True))
+
+
+def release_winner_notifications(auction_ids):
+    Auction.objects.filter(pk__in=auction_ids).update(winner_notified_at=None)
+
+
+def send_winner_notifications(auction_ids):
+    """
+    Email the winners of the given closed auctions with one send_messages()
+    call. Winners are claimed before sending, so if sending fails every claim
+    of the batch is released and the error re-raised for the caller to retry;
+    messages the server accepted before the failure are then sent twice.
+    Returns the number of messages sent.
+    """
+    claimed = claim_winner_notifications(auction_ids)
+    if not claimed:
+        return 0
+
+    auctions = Auction.objects.filter(pk__in=claimed).select_related('buyer').order_by('pk')
+    try:
+        connection = get_connection()
+        sent = connection.send_messages([build_winner_message(auction, connection) for auction in auctions])
+    except Exception:
+        release_winner_notifications(claimed)
+        raise
+    return sent or 0
@@ -0,0 +1,87 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidate_user
+from .categories import category_registry
+from .events import publish_event_on_commit
+from .fragments import bump_version_on_commit
+from .images import variants_for
+from .models import Auction, Bid, Category, Comment, User
+from .tasks import process_image
+from .trending import forget_on_commit, record_bid_on_commit
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_categories(sender, **kwargs):
+    # After commit, so a concurrent reader cannot refill the cache with the old rows.
+    transaction.on_commit(category_registry.invalidate)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Covers password changes, deactivation and the last_login update on login. Deleting again
+    # after commit drops a copy another request cached from the old row in the meantime.
+    invalidate_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver(user_logged_out)
+def invalidate_cached_user_on_logout(sender, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
+
+
+@receiver([post_save, post_delete], sender=Auction)
+def invalidate_auction_fragments(sender, instance, **kwargs):
+    bump_version_on_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Bid)
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_auction_fragments_for_related(sender, instance, **kwargs):
+    bump_version_on_commit(instance.auction_id)
+
+
+def saved_change(instance, name, value, update_fields):
+    """
+    The value an Auction field had when it was loaded or last saved, and
+    whether this save changed it. Unknown if the instance was not loaded.
+    """
+    if update_fields is not None and name not in update_fields:
+        return None, False
+    loaded = getattr(instance, '_loaded_values', {})
+    previous = loaded.get(name)
+    instance._loaded_values = {**loaded, name: value}
+    return previous, previous != value
+
+
+@receiver(post_save, sender=Auction)
+def queue_image_processing(sender, instance, created, update_fields=None, **kwargs):
+    # Only a new or replaced image is queued; other saves leave missing variants to backfill_image_variants.
+    _, changed = saved_change(instance, 'image', instance.image.name, update_fields)
+    if (created or changed) and instance.image and not variants_for(instance):
+        transaction.on_commit(lambda: process_image.delay(instance.pk))
+
+
+@receiver(post_save, sender=Auction)
+def publish_auction_closed(sender, instance, created, update_fields=None, **kwargs):
+    # Only the save that closes the auction publishes; later edits of a closed auction do not.
+    was_active, _ = saved_change(instance, 'active', instance.active, update_fields)
+    if not created and was_active and not instance.active:
+        publish_event_on_commit(instance.pk, 'close', {})
+        forget_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Bid)
+def publish_bid(sender, instance, created, **kwargs):
+    if created:
+        publish_event_on_commit(instance.auction_id, 'bid', {'amount': str(instance.amount)})
+        record_bid_on_commit(instance.auction_id)
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment(sender, instance, created, **kwargs):
+    if created and instance.active:
+        publish_event_on_commit(instance.auction_id, 'comment', {'user': str(instance.user)})
@@ -0,0 +1,62 @@
+"""
+Content-addressed storage for auction images.
+
+A file is stored under the SHA-256 of its bytes, e.g.
+images/3a/7b/3a7bd3e2...c9.jpg, so uploading the same photo twice stores it
+once and both auctions point at the same name. Nothing is ever overwritten
+or deleted on save; saving an existing file only refreshes its modification
+time, as does reusing another auction's variants (see images.py). Files that
+no auction references any more are removed by the cleanup_media command.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_PREFIX_DEPTH = 2
+
+
+def content_digest(content):
+    """SHA-256 of a File, read chunk by chunk so large uploads are never held in memory."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content digest and deduplicates identical uploads."""
+
+    def hashed_name(self, name, content):
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        extension = posixpath.splitext(name)[1].lower()
+        digest = content_digest(content)
+        shards = [digest[i * 2:i * 2 + 2] for i in range(HASH_PREFIX_DEPTH)]
+        return posixpath.join(directory, *shards, digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            self.touch(name)
+            return name
+        saved = self._save(name, content)
+        if saved != name:
+            # A concurrent upload of the same bytes won the race; keep its copy.
+            self.delete(saved)
+        return name
+
+
+    def touch(self, name):
+        """Refresh the modification time, so cleanup_media keeps a file that is about to be referenced again."""
+        os.utime(self.path(name))
+
+
+def image_storage():
+    return ContentAddressedStorage()
@@ -1,7 +1,46 @@
+from smtplib import SMTPException
+
 from .celery_py import app
-from .service import send
+from .closing import close_expired_auctions
+from .images import process_auction_image
+from .service import send_winner_notifications
+from .trending import decay_scores, sync_watch_counts
+
+NOTIFICATION_BATCH_SIZE = 100
+
+
+@app.task(
+    autoretry_for=(SMTPException, OSError),
+    retry_backoff=True,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=5,
+)
+def notify_winners(auction_ids):
+    return send_winner_notifications(auction_ids)
+
+
+def queue_winner_notifications(auction_ids):
+    """Queue notify_winners in batches of NOTIFICATION_BATCH_SIZE auctions."""
+    auction_ids = list(auction_ids)
+    for start in range(0, len(auction_ids), NOTIFICATION_BATCH_SIZE):
+        notify_winners.delay(auction_ids[start:start + NOTIFICATION_BATCH_SIZE])
+
+
+@app.task
+def sweep_expired_auctions():
+    """Periodic task (see CELERY_BEAT_SCHEDULE) that closes auctions past their end time."""
+    return close_expired_auctions(notify=queue_winner_notifications)
+
+
+@app.task
+def process_image(auction_id):
+    """Generate the thumbnail and responsive variants of an auction's image."""
+    return process_auction_image(auction_id)
 
 
 @app.task
-def send_email(user_email):
-    send(user_email)
+def update_trending():
+    """Periodic task (see CELERY_BEAT_SCHEDULE) that decays bid velocity and recounts watchers."""
+    decay_scores()
+    sync_watch_counts()
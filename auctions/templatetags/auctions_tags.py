@@ -1,10 +1,26 @@
 from django import template
 
-from auctions.models import Category
+from auctions.categories import category_registry
+from auctions.images import THUMBNAIL_SIZES, srcset, variants_for
 
 register = template.Library()
 
 
 @register.simple_tag()
 def get_categories():
-    return Category.objects.all()
+    return category_registry.all()
+
+
+@register.inclusion_tag('auctions/picture.html')
+def auction_picture(auction, variant_set, sizes):
+    """Render the auction image as a <picture> over its WebP/JPEG variants, or the original until they exist."""
+    context = {'auction': auction, 'sizes': sizes, 'thumbnail_size': THUMBNAIL_SIZES[0] if variant_set == 'thumbnail' else None}
+    variants = variants_for(auction)
+    if variants and variant_set in variants:
+        storage = auction.image.storage
+        context.update(
+            webp_srcset=srcset(variants, variant_set, 'webp', storage),
+            jpeg_srcset=srcset(variants, variant_set, 'jpeg', storage),
+            src=storage.url(variants[variant_set]['jpeg'][0][1]),
+        )
+    return context
@@ -0,0 +1,41 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from .nplusone import NPlusOneDetector
+from .trending import InMemoryScores, set_store
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin that fails any request with an N+1 pattern (see
+    auctions.nplusone) and provides query budget assertions. Each test starts
+    with an empty trending store.
+    """
+    nplusone_threshold = 3
+
+    def setUp(self):
+        super().setUp()
+        detection = override_settings(AUCTIONS_NPLUSONE='raise', AUCTIONS_NPLUSONE_THRESHOLD=self.nplusone_threshold)
+        detection.enable()
+        self.addCleanup(detection.disable)
+        # Scores left by earlier tests would add a trending query to the home page.
+        set_store(InMemoryScores())
+        self.addCleanup(set_store, None)
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        if len(context) > budget:
+            queries = '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(context.captured_queries, 1))
+            self.fail(f'{len(context)} queries exceed the budget of {budget}:\n{queries}')
+
+    @contextmanager
+    def assertNoNPlusOne(self, threshold=None):
+        detector = NPlusOneDetector(self.nplusone_threshold if threshold is None else threshold)
+        with detector.capture():
+            yield detector
+        if detector.violations():
+            self.fail(f'N+1 queries:\n{detector.report()}')
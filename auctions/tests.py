@@ -1,10 +1,63 @@
-from django.test import Client, TestCase
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from PIL import Image
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
-from auctions.models import Category
+from auctions import async_views
+from auctions.archive import archive_closed_auctions, bids_for
+from auctions.backends import USER_CACHE_TIMEOUT, user_cache_key
+from auctions.benchmarks import run_benchmarks
+from auctions.bulk import bid_rows
+from auctions.bidding import ACCEPTED, OUTBID, REJECTED, place_bid
+from auctions.categories import LocalTTLCache, category_registry
+from auctions.closing import close_auctions, close_expired_auctions
+from auctions.events import EventStreamApp, InMemoryBroker, channel_name, publish_event, set_broker
+from auctions.fragments import get_version
+from auctions.images import MISSING, generate_variants, process_auction_image, variant_names
+from auctions.metrics import MeteredCache, MetricsMiddleware, registry
+from auctions.nplusone import NPlusOneDetector, NPlusOneError, NPlusOneMiddleware, query_shape
+from auctions.models import ArchivedBid, ArchivedComment, Auction, Bid, Category, Comment
+from auctions.pagination import CursorPaginator
+from auctions.search import get_search_backend
+from auctions.storage import ContentAddressedStorage
+from auctions.trending import BIDS, WATCHES, InMemoryScores, get_store, set_store
+from auctions.urls import urlpatterns
+from auctions.testing import QueryBudgetMixin
+from auctions.service import send_winner_notifications
+from auctions.tasks import notify_winners, update_trending
+from auctions.utils import comment_page
+from auctions.watchlist import Watch, is_watched, toggle_watch, watched_ids
 
 User = get_user_model()
+image_storage = Auction._meta.get_field('image').storage
 
 
 class AuthenticationTests(TestCase):
@@ -37,6 +90,40 @@ class AuthenticationTests(TestCase):
         response = self.client.post(reverse('logout'))
         self.assertRedirects(response, reverse('index'))
         self.assertFalse('_auth_user_id' in self.client.session)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_authenticated_requests_skip_session_and_user_queries(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['user'], self.user)
+        sql = '\n'.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', sql)
+        self.assertNotIn('FROM "auctions_user"', sql)
+
+    def test_password_change_ends_other_sessions(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('newpass456')
+            self.user.save()
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_queryset_deactivation_takes_effect_when_cached_user_expires(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('index'))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with mock.patch('time.time', return_value=time.time() + USER_CACHE_TIMEOUT + 1):
+            response = self.client.get(reverse('index'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_sessions_survive_losing_the_cache(self):
+        self.client.force_login(self.user)
+        cache.clear()
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['user'], self.user)
 
     def test_register_view_with_valid_data(self):
         response = self.client.post(reverse('register'), {
@@ -90,10 +177,1641 @@ class CategoryUnitTestCase(TestCase):
         self.assertEqual(str(data.category_name), 'Books')
 
 
-class IndexRequestTestCase(TestCase):
+class IndexRequestTestCase(QueryBudgetMixin, TestCase):
     def setUp(self):
+        super().setUp()
         self.client = Client()
 
     def test_index_view(self):
         response = self.client.get(reverse('index'))
         self.assertEqual(response.status_code, 200)
+
+    def test_index_sorted_by_bids(self):
+        author = User.objects.create_user(username='seller', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        quiet = Auction.objects.create(
+            title='Quiet', author=author, starting_bid=Decimal('1.00'), image='images/a.png', category=category,
+        )
+        busy = Auction.objects.create(
+            title='Busy', author=author, starting_bid=Decimal('1.00'), image='images/b.png', category=category,
+            bid_count=5, created=quiet.created - timedelta(days=1),
+        )
+        response = self.client.get(reverse('index'), {'sort': 'bids'})
+        self.assertEqual(list(response.context['auctions']), [busy, quiet])
+        response = self.client.get(reverse('index'))
+        self.assertEqual(list(response.context['auctions']), [quiet, busy])
+
+
+class PlaceBidTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='seller', password='pass123')
+        self.bidder = User.objects.create_user(username='bidder', password='pass123')
+        self.category = Category.objects.create(category_name='Books')
+        self.auction = Auction.objects.create(
+            title='Book', description='Old book', author=self.author, starting_bid=Decimal('10.00'),
+            image='images/book.png', category=self.category,
+        )
+
+    def test_first_bid_must_reach_starting_price(self):
+        self.assertEqual(place_bid(self.auction.pk, self.bidder, '9.99').status, REJECTED)
+        result = place_bid(self.auction.pk, self.bidder, '10.00')
+        self.assertEqual(result.status, ACCEPTED)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_bid, Decimal('10.00'))
+        self.assertIn(self.bidder, self.auction.watchers.all())
+
+    def test_lower_or_equal_bid_is_outbid(self):
+        place_bid(self.auction.pk, self.bidder, '15.00')
+        result = place_bid(self.auction.pk, self.author, '15.00')
+        self.assertEqual(result.status, OUTBID)
+        self.assertEqual(result.current_bid, Decimal('15.00'))
+        self.assertEqual(Bid.objects.filter(auction=self.auction).count(), 1)
+
+    def test_closed_auction_rejects_bids(self):
+        Auction.objects.filter(pk=self.auction.pk).update(active=False)
+        self.assertEqual(place_bid(self.auction.pk, self.bidder, '20.00').status, REJECTED)
+
+    def test_bid_statistics_are_maintained(self):
+        place_bid(self.auction.pk, self.bidder, '12.00')
+        result = place_bid(self.auction.pk, self.author, '14.00')
+        place_bid(self.auction.pk, self.bidder, '13.00')
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.bid_count, 2)
+        self.assertEqual(self.auction.leading_bid, result.bid)
+        self.assertEqual(self.auction.last_bid_at, result.bid.created)
+
+    def test_unknown_auction_raises(self):
+        with self.assertRaises(Auction.DoesNotExist):
+            place_bid(self.auction.pk + 1, self.bidder, '20.00')
+
+
+class BackfillBidStatsTestCase(TestCase):
+    def test_backfill_recomputes_statistics(self):
+        author = User.objects.create_user(username='seller', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        auctions = [
+            Auction.objects.create(
+                title=f'Book {i}', author=author, starting_bid=Decimal('1.00'),
+                image='images/book.png', category=category,
+            )
+            for i in range(3)
+        ]
+        Bid.objects.create(auction=auctions[0], user=author, amount=Decimal('2.00'))
+        top = Bid.objects.create(auction=auctions[0], user=author, amount=Decimal('5.00'))
+        Bid.objects.create(auction=auctions[0], user=author, amount=Decimal('3.00'))
+
+        call_command('backfill_bid_stats', batch_size=2, stdout=StringIO())
+
+        auctions[0].refresh_from_db()
+        auctions[1].refresh_from_db()
+        self.assertEqual(auctions[0].bid_count, 3)
+        self.assertEqual(auctions[0].leading_bid, top)
+        self.assertIsNotNone(auctions[0].last_bid_at)
+        self.assertEqual(auctions[1].bid_count, 0)
+        self.assertIsNone(auctions[1].leading_bid)
+
+
+class WatchlistTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='watcher', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        self.auctions = [
+            Auction.objects.create(
+                title=f'Book {i}', author=self.user, starting_bid=Decimal('1.00'), image='images/a.png',
+                category=category,
+            )
+            for i in range(4)
+        ]
+        self.auctions[1].watchers.add(self.user)
+        self.auctions[3].watchers.add(self.user)
+
+    def test_membership_queries(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(is_watched(self.user, self.auctions[1].pk))
+        self.assertFalse(is_watched(self.user, self.auctions[0].pk))
+        with self.assertNumQueries(1):
+            ids = watched_ids(self.user, [a.pk for a in self.auctions])
+        self.assertEqual(ids, {self.auctions[1].pk, self.auctions[3].pk})
+
+    def test_toggle(self):
+        self.assertTrue(toggle_watch(self.user, self.auctions[0].pk))
+        self.assertTrue(is_watched(self.user, self.auctions[0].pk))
+        self.assertFalse(toggle_watch(self.user, self.auctions[0].pk))
+        self.assertFalse(is_watched(self.user, self.auctions[0].pk))
+
+    def test_listing_is_annotated(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('index'))
+        watched = {a.pk for a in response.context['auctions'] if a.is_watched}
+        self.assertEqual(watched, {self.auctions[1].pk, self.auctions[3].pk})
+
+    def test_auction_page_and_watch_button(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('auction', args=[self.auctions[1].pk]))
+        self.assertContains(response, 'Remove from Watchlist')
+        response = self.client.get(reverse('watchlist_edit', args=[self.auctions[1].pk]))
+        self.assertRedirects(response, reverse('auction', args=[self.auctions[1].pk]))
+        response = self.client.get(reverse('auction', args=[self.auctions[1].pk]))
+        self.assertContains(response, 'Add to Watchlist')
+        response = self.client.get(reverse('watchlist_edit', args=[self.auctions[-1].pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class AuctionFragmentCacheTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        self.auction = Auction.objects.create(
+            title='Book', description='Signed first edition', author=self.user, starting_bid=Decimal('1.00'),
+            image='images/a.png', category=category,
+        )
+        for i in range(5):
+            Comment.objects.create(user=self.user, auction=self.auction, comment=f'Comment {i}')
+        self.url = reverse('auction', args=[self.auction.pk])
+
+    def test_warm_fragment_skips_comment_queries(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Signed first edition')
+        self.assertContains(response, 'Comment 4')
+        self.assertEqual(len(warm), 1)
+        self.assertGreater(len(cold), len(warm))
+
+    def test_new_comment_invalidates_fragment(self):
+        self.client.get(self.url)
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('comment', args=[self.auction.pk]), {'comment': 'Fresh comment'})
+        self.assertContains(self.client.get(self.url), 'Fresh comment')
+
+    def test_bid_bumps_version(self):
+        bidder = User.objects.create_user(username='bidder', password='pass123')
+        version = get_version(self.auction.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(self.auction.pk, bidder, '2.00')
+        self.assertGreater(get_version(self.auction.pk), version)
+
+
+class CommentPaginationTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        users = [User.objects.create_user(username=f'user{i}', password='pass123') for i in range(3)]
+        category = Category.objects.create(category_name='Books')
+        self.auction = Auction.objects.create(
+            title='Book', author=users[0], starting_bid=Decimal('1.00'), image='images/a.png', category=category,
+        )
+        for i in range(25):
+            Comment.objects.create(user=users[i % 3], auction=self.auction, comment=f'Comment #{i}.')
+        Comment.objects.create(user=users[0], auction=self.auction, comment='Hidden comment.', active=False)
+
+    def test_first_page_is_inline(self):
+        response = self.client.get(reverse('auction', args=[self.auction.pk]))
+        self.assertContains(response, 'Comment #19.')
+        self.assertNotContains(response, 'Comment #20.')
+        self.assertNotContains(response, 'Hidden comment.')
+        self.assertContains(response, 'Load more comments')
+
+    def test_next_page_endpoint(self):
+        first = comment_page(self.auction.pk)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('auction_comments', args=[self.auction.pk]), {'cursor': first.next_cursor}
+            )
+        self.assertContains(response, 'Comment #20.')
+        self.assertContains(response, 'Comment #24.')
+        self.assertNotContains(response, 'Comment #19.')
+        self.assertNotContains(response, 'Hidden comment.')
+        self.assertNotContains(response, 'Load more comments')
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('auction_comments', args=[self.auction.pk]), {'cursor': 'x'})
+        self.assertEqual(response.status_code, 404)
+
+
+class WinnerNotificationTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='seller', password='pass123')
+        self.buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        self.auction = Auction.objects.create(
+            title='Book', author=self.author, starting_bid=Decimal('1.00'), image='images/a.png', category=category,
+        )
+
+    def close(self):
+        self.client.force_login(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(reverse('auction_close', args=[self.auction.pk]))
+
+    def test_close_queues_one_notification(self):
+        place_bid(self.auction.pk, self.buyer, '5.00')
+        with mock.patch('auctions.tasks.notify_winners.delay') as delay:
+            response = self.close()
+        self.assertRedirects(response, reverse('auction', args=[self.auction.pk]))
+        delay.assert_called_once_with([self.auction.pk])
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.buyer, self.buyer)
+
+    def test_bid_accepted_while_closing_wins(self):
+        bidder = User.objects.create_user(username='late', password='pass123')
+        place_bid(self.auction.pk, self.buyer, '5.00')
+
+        def load_then_outbid(*args, **kwargs):
+            auction = get_object_or_404(*args, **kwargs)
+            place_bid(self.auction.pk, bidder, '9.00')
+            return auction
+
+        with mock.patch('auctions.views.get_object_or_404', side_effect=load_then_outbid):
+            with mock.patch('auctions.tasks.notify_winners.delay'):
+                self.close()
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.current_bid, self.auction.bid_count), (Decimal('9.00'), 2))
+        self.assertEqual(self.auction.buyer, bidder)
+
+    def test_close_without_bids_sends_nothing(self):
+        with mock.patch('auctions.tasks.notify_winners.delay') as delay:
+            response = self.close()
+        self.assertEqual(response.status_code, 302)
+        delay.assert_not_called()
+
+    def test_winner_is_mailed_exactly_once(self):
+        place_bid(self.auction.pk, self.buyer, '5.00')
+        Auction.objects.filter(pk=self.auction.pk).update(active=False, buyer=self.buyer)
+        self.assertEqual(notify_winners.apply(args=[[self.auction.pk]]).get(), 1)
+        self.assertEqual(notify_winners.apply(args=[[self.auction.pk]]).get(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['buyer@example.com'])
+        self.assertIn('$5.00', mail.outbox[0].body)
+
+    def test_batch_is_claimed_and_sent_together(self):
+        other = Auction.objects.create(
+            title='Map', author=self.author, starting_bid=Decimal('1.00'), image='images/a.png',
+            category=self.auction.category,
+        )
+        notified = Auction.objects.create(
+            title='Atlas', author=self.author, starting_bid=Decimal('1.00'), image='images/a.png',
+            category=self.auction.category, winner_notified_at=timezone.now(),
+        )
+        ids = [self.auction.pk, other.pk, notified.pk]
+        Auction.objects.filter(pk__in=ids).update(active=False, buyer=self.buyer, current_bid=5)
+        with self.assertNumQueries(3):
+            self.assertEqual(send_winner_notifications(ids), 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failed_send_releases_claim(self):
+        Auction.objects.filter(pk=self.auction.pk).update(active=False, buyer=self.buyer, current_bid=5)
+        with mock.patch('auctions.service.get_connection', side_effect=SMTPException):
+            with self.assertRaises(SMTPException):
+                send_winner_notifications([self.auction.pk])
+        self.auction.refresh_from_db()
+        self.assertIsNone(self.auction.winner_notified_at)
+        self.assertEqual(send_winner_notifications([self.auction.pk]), 1)
+
+    def test_task_retries_after_smtp_error(self):
+        Auction.objects.filter(pk=self.auction.pk).update(active=False, buyer=self.buyer, current_bid=5)
+        real_get_connection = mail.get_connection
+        side_effects = [SMTPException, real_get_connection()]
+        with mock.patch('auctions.service.get_connection', side_effect=side_effects):
+            result = notify_winners.apply(args=[[self.auction.pk]], throw=False)
+        self.assertEqual(result.get(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class ExpiredAuctionSweepTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='seller', password='pass123')
+        self.bidder = User.objects.create_user(username='bidder', email='bidder@example.com', password='pass123')
+        self.category = Category.objects.create(category_name='Books')
+        self.now = timezone.now()
+
+    def create_auction(self, ends_at):
+        return Auction.objects.create(
+            title='Book', author=self.author, starting_bid=Decimal('1.00'), image='images/a.png',
+            category=self.category, ends_at=ends_at,
+        )
+
+    def test_sweep_closes_expired_auctions_in_batches(self):
+        expired = [self.create_auction(self.now + timedelta(minutes=1)) for _ in range(5)]
+        for auction in expired[:3]:
+            place_bid(auction.pk, self.bidder, '2.00')
+        running = self.create_auction(self.now + timedelta(days=1))
+        unscheduled = self.create_auction(None)
+        notified = []
+
+        with self.captureOnCommitCallbacks(execute=True):
+            closed = close_expired_auctions(
+                notify=notified.extend, now=self.now + timedelta(minutes=2), batch_size=2
+            )
+        self.assertEqual(closed, 5)
+        self.assertFalse(Auction.objects.filter(pk__in=[a.pk for a in expired], active=True).exists())
+        self.assertEqual(
+            set(Auction.objects.filter(buyer=self.bidder).values_list('pk', flat=True)),
+            {a.pk for a in expired[:3]},
+        )
+        self.assertTrue(Auction.objects.get(pk=running.pk).active)
+        self.assertTrue(Auction.objects.get(pk=unscheduled.pk).active)
+        self.assertEqual(sorted(notified), [a.pk for a in expired[:3]])
+
+    def test_already_closed_auctions_are_left_alone(self):
+        open_auction = self.create_auction(None)
+        sold = self.create_auction(None)
+        Auction.objects.filter(pk=sold.pk).update(active=False, buyer=self.bidder, closed_at=self.now)
+        notified = []
+        with mock.patch('auctions.closing.publish_event_on_commit') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                closed = close_auctions([open_auction.pk, sold.pk], notify=notified.extend)
+        self.assertEqual(closed, 1)
+        self.assertEqual(notified, [])
+        publish.assert_called_once_with(open_auction.pk, 'close', {})
+        self.assertEqual(Auction.objects.get(pk=sold.pk).closed_at, self.now)
+
+    def test_command_queues_notifications(self):
+        auction = self.create_auction(self.now + timedelta(seconds=1))
+        place_bid(auction.pk, self.bidder, '2.00')
+        Auction.objects.filter(pk=auction.pk).update(ends_at=self.now - timedelta(seconds=1))
+        with mock.patch('auctions.tasks.notify_winners.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('close_expired_auctions', stdout=StringIO())
+        delay.assert_called_once_with([auction.pk])
+
+    def test_bids_after_end_are_rejected(self):
+        auction = self.create_auction(self.now + timedelta(seconds=1))
+        Auction.objects.filter(pk=auction.pk).update(ends_at=self.now - timedelta(seconds=1))
+        self.assertEqual(place_bid(auction.pk, self.bidder, '2.00').status, REJECTED)
+
+
+class EventStreamTestCase(SimpleTestCase):
+    def setUp(self):
+        self.broker = InMemoryBroker()
+        set_broker(self.broker)
+
+    def tearDown(self):
+        set_broker(None)
+
+    @override_settings(AUCTIONS_EVENTS_REDIS_URL=None, AUCTIONS_EVENTS_IN_PROCESS=False)
+    def test_several_processes_need_redis(self):
+        set_broker(None)
+        with self.assertRaises(ImproperlyConfigured):
+            EventStreamApp(mock.AsyncMock())
+
+    async def open_streams(self, count, auction_id=7, heartbeat=15):
+        app = EventStreamApp(mock.AsyncMock(), heartbeat=heartbeat)
+        disconnect = asyncio.Event()
+        streams = []
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        for _ in range(count):
+            sent = []
+
+            async def send(message, sent=sent):
+                sent.append(message)
+
+            scope = {'type': 'http', 'path': f'/auction/{auction_id}/events', 'method': 'GET'}
+            streams.append((asyncio.create_task(app(scope, receive, send)), sent))
+        while self.broker.subscriber_count(channel_name(auction_id)) < count:
+            await asyncio.sleep(0)
+        return app, disconnect, streams
+
+    def test_published_events_reach_every_idle_stream(self):
+        async def scenario():
+            app, disconnect, streams = await self.open_streams(1000)
+            await asyncio.to_thread(publish_event, 7, 'bid', {'amount': '5.00'})
+            await asyncio.sleep(0.05)
+            disconnect.set()
+            await asyncio.wait_for(asyncio.gather(*(task for task, _ in streams)), 5)
+            return app, streams
+
+        app, streams = asyncio.run(scenario())
+        for _, sent in streams:
+            self.assertEqual(sent[0]['status'], 200)
+            self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+            body = b''.join(message.get('body', b'') for message in sent[1:])
+            self.assertIn(b'event: bid\ndata: {"amount": "5.00"}\n\n', body)
+        self.assertEqual(self.broker.subscriber_count(), 0)
+        app.application.assert_not_called()
+
+    def test_idle_stream_sends_heartbeats(self):
+        async def scenario():
+            _, disconnect, streams = await self.open_streams(1, heartbeat=0.01)
+            await asyncio.sleep(0.05)
+            disconnect.set()
+            await asyncio.wait_for(streams[0][0], 1)
+            return streams[0][1]
+
+        sent = asyncio.run(scenario())
+        self.assertIn(b': ping\n\n', [message.get('body') for message in sent])
+
+    def test_other_requests_go_to_django(self):
+        app = EventStreamApp(mock.AsyncMock())
+        scope = {'type': 'http', 'path': '/auction/7', 'method': 'GET'}
+        asyncio.run(app(scope, None, None))
+        app.application.assert_awaited_once_with(scope, None, None)
+
+
+class EventPublishingTestCase(TestCase):
+    def test_bid_and_close_publish_after_commit(self):
+        author = User.objects.create_user(username='seller', password='pass123')
+        bidder = User.objects.create_user(username='bidder', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        auction = Auction.objects.create(
+            title='Book', author=author, starting_bid=Decimal('1.00'), image='images/a.png', category=category,
+        )
+        self.client.force_login(author)
+        with mock.patch('auctions.events.publish_event') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                place_bid(auction.pk, bidder, '3.00')
+            with mock.patch('auctions.tasks.notify_winners.delay'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.get(reverse('auction_close', args=[auction.pk]))
+        publish.assert_has_calls([
+            mock.call(auction.pk, 'bid', {'amount': '3.00'}),
+            mock.call(auction.pk, 'close', {}),
+        ])
+
+        with mock.patch('auctions.events.publish_event') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                auction = Auction.objects.get(pk=auction.pk)
+                auction.title = 'Old book'
+                auction.save()
+                self.client.get(reverse('auction_close', args=[auction.pk]))
+        publish.assert_not_called()
+
+    def bid_through_view(self):
+        author = User.objects.create_user(username='seller', password='pass123')
+        bidder = User.objects.create_user(username='bidder', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        auction = Auction.objects.create(
+            title='Book', author=author, starting_bid=Decimal('1.00'), image='images/a.png', category=category,
+        )
+        self.client.force_login(bidder)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('auction_bid', args=[auction.pk]), {'amount': '3.00'})
+        self.assertRedirects(response, reverse('auction', args=[auction.pk]), fetch_redirect_response=False)
+        self.assertEqual(Bid.objects.filter(auction=auction).count(), 1)
+
+    @override_settings(AUCTIONS_EVENTS_REDIS_URL=None, AUCTIONS_EVENTS_IN_PROCESS=False)
+    def test_bids_without_a_broker_publish_nothing(self):
+        set_broker(None)
+        self.addCleanup(set_broker, None)
+        self.bid_through_view()
+
+    def test_broker_errors_do_not_fail_the_request(self):
+        broker = mock.Mock(publish=mock.Mock(side_effect=ConnectionError))
+        set_broker(broker)
+        self.addCleanup(set_broker, None)
+        with self.assertLogs('auctions.events', 'ERROR'):
+            self.bid_through_view()
+        broker.publish.assert_called_once()
+
+    def test_wsgi_fallback_stops_reconnects(self):
+        response = self.client.get(reverse('auction_events', args=[1]))
+        self.assertEqual(response.status_code, 204)
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate()
+        self.user = User.objects.create_user(username='seller', password='pass123')
+        self.category = Category.objects.create(category_name='Books')
+        created = timezone.now()
+        self.auctions = [
+            Auction.objects.create(
+                title=f'Book {i}', author=self.user, starting_bid=Decimal('1.00'), image='images/a.png',
+                category=self.category, created=created - timedelta(minutes=i),
+            )
+            for i in range(8)
+        ]
+        self.auctions[2].watchers.add(self.user)
+        self.factory = RequestFactory()
+
+    def get(self, view, path, user=None, **kwargs):
+        request = self.factory.get(path)
+        request.user = user or AnonymousUser()
+        response = async_to_sync(view.as_view())(request, **kwargs)
+        return response.render()
+
+    def test_home_matches_sync_view(self):
+        response = self.get(async_views.AuctionsHome, '/', user=self.user)
+        self.assertEqual(list(response.context_data['auctions']), self.auctions[:6])
+        self.assertEqual([a.is_watched for a in response.context_data['auctions']][:3], [False, False, True])
+        cursor = response.context_data['page_obj'].next_cursor
+        response = self.get(async_views.AuctionsHome, f'/?cursor={cursor}')
+        self.assertEqual(list(response.context_data['auctions']), self.auctions[6:])
+
+    def test_offset_pagination(self):
+        response = self.get(async_views.AuctionsHome, '/?sort=bids&page=2')
+        self.assertEqual(response.context_data['paginator'].count, 8)
+        self.assertEqual(len(response.context_data['auctions']), 2)
+        with self.assertRaises(Http404):
+            self.get(async_views.AuctionsHome, '/?sort=bids&page=9')
+
+    def test_category_and_search(self):
+        response = self.get(async_views.AuctionCategory, '/categories/Books', category_name='Books')
+        self.assertEqual(len(response.context_data['auctions']), 6)
+        with self.assertRaises(Http404):
+            self.get(async_views.AuctionCategory, '/categories/Toys', category_name='Toys')
+        response = self.get(async_views.AuctionSearch, '/search?q=book')
+        self.assertEqual(response.context_data['paginator'].count, 8)
+
+    def test_auction_page(self):
+        response = self.get(async_views.AuctionPage, '/auction', user=self.user, auction_id=self.auctions[2].pk)
+        self.assertContains(response, 'Remove from Watchlist')
+        with self.assertRaises(Http404):
+            self.get(async_views.AuctionPage, '/auction', auction_id=0)
+
+
+class ImageVariantsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='seller', password='pass123')
+        self.category = Category.objects.create(category_name='Cameras')
+
+    def upload(self, size):
+        image = Image.new('RGB', size, 'red')
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', exif=exif)
+        return image_storage.save('images/photo.jpg', ContentFile(buffer.getvalue()))
+
+    def create_auction(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Auction.objects.create(
+                title='Camera', author=self.user, starting_bid=Decimal('1.00'), image=image, category=self.category,
+            )
+
+    def test_upload_generates_variants(self):
+        auction = self.create_auction(self.upload((2000, 1000)))
+        auction.refresh_from_db()
+        variants = auction.image_variants
+
+        self.assertEqual(variants['source'], auction.image.name)
+        self.assertEqual([width for width, _ in variants['thumbnail']['webp']], [400, 800])
+        self.assertEqual([width for width, _ in variants['responsive']['jpeg']], [480, 960, 1600])
+        with image_storage.open(variants['thumbnail']['webp'][0][1]) as f:
+            thumbnail = Image.open(f)
+            self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (400, 300)))
+        with image_storage.open(variants['responsive']['jpeg'][0][1]) as f:
+            responsive = Image.open(f)
+            self.assertEqual(responsive.size, (480, 240))
+            self.assertEqual(len(responsive.getexif()), 0)
+
+    def test_variants_of_same_stem_do_not_collide(self):
+        names = []
+        for name, fmt, color in (('images/photo.jpg', 'JPEG', 'blue'), ('images/photo.png', 'PNG', 'green'),
+                                 ('other/photo.jpg', 'JPEG', 'yellow')):
+            buffer = BytesIO()
+            Image.new('RGB', (500, 400), color).save(buffer, format=fmt)
+            stored = image_storage.save(name, ContentFile(buffer.getvalue()))
+            names.append(generate_variants(Auction(image=stored).image)['thumbnail']['webp'][0][1])
+        self.assertEqual(len(set(names)), 3)
+        self.assertTrue(all(image_storage.exists(name) for name in names))
+
+        # Regenerating writes the same files again instead of failing or duplicating them.
+        self.assertEqual(generate_variants(Auction(image=stored).image)['thumbnail']['webp'][0][1], names[-1])
+
+    def test_small_image_is_not_upscaled(self):
+        auction = self.create_auction(self.upload((600, 300)))
+        auction.refresh_from_db()
+        self.assertEqual([width for width, _ in auction.image_variants['responsive']['webp']], [480, 600])
+
+    def test_templates_render_srcset(self):
+        auction = self.create_auction(self.upload((1000, 800)))
+        auction.refresh_from_db()
+        variants = auction.image_variants
+        index = self.client.get(reverse('index'))
+        self.assertContains(index, 'type="image/webp"')
+        self.assertContains(index, f'/media/{variants["thumbnail"]["webp"][1][1]} 800w')
+        page = self.client.get(reverse('auction', args=[auction.pk]))
+        self.assertContains(page, f'/media/{variants["responsive"]["jpeg"][1][1]} 960w')
+
+    def test_original_is_served_until_variants_exist(self):
+        auction = self.create_auction('images/missing.jpg')
+        self.assertEqual(process_auction_image(auction.pk), MISSING)
+        self.assertContains(self.client.get(reverse('index')), 'src="/media/images/missing.jpg"')
+
+    def test_only_new_or_replaced_images_are_queued(self):
+        auction = self.create_auction('images/missing.jpg')
+        auction = Auction.objects.get(pk=auction.pk)
+        with mock.patch('auctions.tasks.process_image.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                auction.title = 'Camera body'
+                auction.save()
+            delay.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                auction.image = self.upload((800, 600))
+                auction.save()
+        delay.assert_called_once_with(auction.pk)
+
+    def test_backfill_command(self):
+        name = self.upload((800, 600))
+        auction = Auction.objects.create(
+            title='Camera', author=self.user, starting_bid=Decimal('1.00'), image=name, category=self.category,
+        )
+        out = StringIO()
+        call_command('backfill_image_variants', workers=1, stdout=out)
+        self.assertIn('1 processed', out.getvalue())
+        auction.refresh_from_db()
+        self.assertEqual(auction.image_variants['source'], name)
+
+    def test_reupload_shares_file_and_variants(self):
+        first = self.create_auction(self.upload((800, 600)))
+        with mock.patch('auctions.images.generate_variants') as generate:
+            second = self.create_auction(self.upload((800, 600)))
+        generate.assert_not_called()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image_variants, second.image_variants)
+
+    def test_cleanup_media_deletes_orphans(self):
+        auction = self.create_auction(self.upload((800, 600)))
+        auction.refresh_from_db()
+        orphan = image_storage.save('images/old.jpg', ContentFile(b'not referenced'))
+
+        out = StringIO()
+        call_command('cleanup_media', min_age=0, dry_run=True, stdout=out)
+        self.assertIn('Would delete 1 orphans', out.getvalue())
+        self.assertTrue(image_storage.exists(orphan))
+
+        call_command('cleanup_media', min_age=0, stdout=StringIO())
+        self.assertFalse(image_storage.exists(orphan))
+        self.assertTrue(image_storage.exists(auction.image.name))
+        self.assertTrue(image_storage.exists(auction.image_variants['thumbnail']['jpeg'][0][1]))
+
+    def test_cleanup_media_keeps_reused_files(self):
+        name = self.upload((800, 600))
+        old = time.time() - 2 * 24 * 60 * 60
+        os.utime(image_storage.path(name), (old, old))
+        self.assertEqual(self.upload((800, 600)), name)
+        call_command('cleanup_media', stdout=StringIO())
+        self.assertTrue(image_storage.exists(name))
+
+        os.utime(image_storage.path(name), (old, old))
+
+        def walk_while_auction_is_committed(storage, path):
+            # The auction is committed after the references were counted.
+            Auction.objects.create(
+                title='Camera', author=self.user, starting_bid=Decimal('1.00'), image=name, category=self.category,
+            )
+            yield name
+
+        with mock.patch('auctions.management.commands.cleanup_media.walk', walk_while_auction_is_committed):
+            call_command('cleanup_media', stdout=StringIO())
+        self.assertTrue(image_storage.exists(name))
+
+    def test_reused_variants_are_refreshed(self):
+        first = self.create_auction(self.upload((800, 600)))
+        first.refresh_from_db()
+        names = list(variant_names(first.image_variants))
+        old = time.time() - 2 * 24 * 60 * 60
+        for name in names:
+            os.utime(image_storage.path(name), (old, old))
+        self.create_auction(self.upload((800, 600)))
+        for name in names:
+            self.assertGreater(os.path.getmtime(image_storage.path(name)), old)
+
+        image_storage.delete(names[0])
+        third = self.create_auction(self.upload((800, 600)))
+        third.refresh_from_db()
+        self.assertTrue(all(image_storage.exists(name) for name in variant_names(third.image_variants)))
+
+    def test_cleanup_media_keeps_recent_uploads(self):
+        orphan = image_storage.save('images/new.jpg', ContentFile(b'upload in progress'))
+        call_command('cleanup_media', stdout=StringIO())
+        self.assertTrue(image_storage.exists(orphan))
+
+
+class ContentAddressedStorageTestCase(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def test_name_is_content_digest(self):
+        content = b'x' * (3 * 64 * 1024 + 17)
+        name = self.storage.save('images/Photo.JPG', ContentFile(content))
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(name, f'images/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), content)
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save('images/a.jpg', ContentFile(b'same bytes'))
+        second = self.storage.save('images/b.jpg', ContentFile(b'same bytes'))
+        other = self.storage.save('images/c.jpg', ContentFile(b'other bytes'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = os.path.dirname(self.storage.path(first))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first)])
+
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        author = User.objects.create_user(username='seller', password='pass123')
+        Auction.objects.create(
+            title='Book', author=author, starting_bid=Decimal('1.00'), image='images/a.png',
+            category=Category.objects.create(category_name='Books'),
+        )
+
+    def test_request_metrics_are_exported(self):
+        self.client.get(reverse('index'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('auctions_requests_total{view="index",method="GET",status="200"} 1', body)
+        self.assertIn('auctions_request_duration_seconds_bucket{view="index",le="+Inf"} 1', body)
+        self.assertIn('auctions_db_queries_count{view="index"} 1', body)
+        self.assertIn('auctions_template_render_seconds_count{view="index"} 1', body)
+        self.assertNotIn('auctions_db_queries_bucket{view="index",le="0"} 1', body)
+
+    async def test_async_requests_are_recorded(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(MetricsMiddleware(get_response)))
+        await self.async_client.get(reverse('index'))
+        labels = (('view', 'index'), ('method', 'GET'), ('status', 200))
+        self.assertEqual(registry.value('auctions_requests_total', labels), 1)
+        body = registry.render()
+        self.assertIn('auctions_db_queries_count{view="index"} 1', body)
+        self.assertNotIn('auctions_db_queries_bucket{view="index",le="0"} 1', body)
+
+    @override_settings(AUCTIONS_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_only_record_latency(self):
+        self.client.get(reverse('index'))
+        body = registry.render()
+        self.assertIn('auctions_request_duration_seconds_count{view="index"} 1', body)
+        self.assertNotIn('auctions_db_queries', body.replace('# HELP auctions_db_queries', ''))
+
+    @override_settings(AUCTIONS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.assertLogs('auctions.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('index'))
+        self.assertIn('SELECT', logs.output[0])
+        self.assertEqual(registry.value('auctions_slow_requests_total', (('view', 'index'),)), 1)
+
+    @override_settings(AUCTIONS_METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_metered_cache_counts_hits_and_misses(self):
+        metered = MeteredCache('metrics-test', {
+            'OPTIONS': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        })
+        self.assertIsNone(metered.get('key'))
+        metered.set('key', 'value')
+        self.assertEqual(metered.get('key'), 'value')
+        self.assertEqual(metered.get_many(['key', 'other']), {'key': 'value'})
+        self.assertEqual(registry.value('auctions_cache_requests_total', (('result', 'hit'),)), 2)
+        self.assertEqual(registry.value('auctions_cache_requests_total', (('result', 'miss'),)), 2)
+
+
+class NPlusOneTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='pass123', email='a@example.com')
+        category = Category.objects.create(category_name='Books')
+        for i in range(3):
+            seller = User.objects.create_user(username=f'seller{i}', password='pass123')
+            auction = Auction.objects.create(
+                title=f'Book {i}', author=seller, starting_bid=Decimal('1.00'), image='images/a.png',
+                category=category,
+            )
+            Bid.objects.create(auction=auction, user=self.admin, amount=Decimal('2.00'))
+            Comment.objects.create(auction=auction, user=seller, comment='Nice')
+
+    def test_query_shape_ignores_literals(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = \'x\' LIMIT 21'),
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s) AND name = \'y\' LIMIT 5'),
+        )
+
+    def test_detector_reports_code_site(self):
+        with self.assertRaises(AssertionError) as failure:
+            with self.assertNoNPlusOne():
+                [str(bid) for bid in Bid.objects.all()]
+        self.assertIn('auctions/models.py', str(failure.exception))
+        self.assertIn('in __str__', str(failure.exception))
+
+    def test_detector_reports_template_line(self):
+        from django.template import engines
+
+        template = engines['django'].from_string('{% for bid in bids %}{{ bid.user }}{% endfor %}')
+        detector = NPlusOneDetector(threshold=2)
+        with detector.capture():
+            template.render({'bids': Bid.objects.all()})
+        self.assertIn('<unknown source>, line 1', detector.report())
+
+    def test_middleware_raises_on_template_loop(self):
+        auction = Auction.objects.first()
+        for user in User.objects.all():
+            Comment.objects.create(auction=auction, user=user, comment='Hello')
+
+        def comments_without_users(auction_id, cursor=None, per_page=20, archived=False):
+            comments = Comment.objects.filter(auction_id=auction_id)
+            return CursorPaginator(comments, per_page, ordering=('created', 'id')).page(cursor)
+
+        with mock.patch('auctions.views.comment_page', comments_without_users):
+            with self.assertRaisesMessage(NPlusOneError, 'from template auctions/comments.html, line 4'):
+                self.client.get(reverse('auction', args=[auction.pk]))
+
+    async def test_middleware_checks_async_requests(self):
+        auction = await Auction.objects.afirst()
+        async for user in User.objects.all():
+            await Comment.objects.acreate(auction=auction, user=user, comment='Hello')
+        comments = Comment.objects.filter(auction_id=auction.pk)
+
+        def comments_without_users(auction_id, cursor=None, per_page=20, archived=False):
+            return CursorPaginator(comments, per_page, ordering=('created', 'id')).page(cursor)
+
+        with mock.patch('auctions.views.comment_page', comments_without_users):
+            with self.assertRaises(NPlusOneError):
+                await self.async_client.get(reverse('auction', args=[auction.pk]))
+
+    @override_settings(AUCTIONS_NPLUSONE=None)
+    def test_middleware_is_dropped_when_off(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            NPlusOneMiddleware(lambda request: HttpResponse())
+
+    def test_pages_stay_within_query_budget(self):
+        auction = Auction.objects.first()
+        with self.assertMaxQueries(2):
+            self.client.get(reverse('index'))
+        with self.assertMaxQueries(4):
+            self.client.get(reverse('auction', args=[auction.pk]))
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        for model in ('auction', 'bid', 'comment'):
+            with self.subTest(model=model), self.assertMaxQueries(8):
+                response = self.client.get(reverse(f'admin:auctions_{model}_changelist'))
+                self.assertEqual(response.status_code, 200)
+
+    def test_admin_close_selected(self):
+        auction, closed = Auction.objects.order_by('pk')[:2]
+        bid = Bid.objects.get(auction=auction)
+        Auction.objects.filter(pk=auction.pk).update(leading_bid=bid)
+        Auction.objects.filter(pk=closed.pk).update(active=False)
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:auctions_auction_changelist'), {
+                'action': 'close_selected', '_selected_action': [auction.pk, closed.pk],
+            })
+        self.assertEqual(response.status_code, 302)
+        auction.refresh_from_db()
+        closed.refresh_from_db()
+        self.assertFalse(auction.active)
+        self.assertEqual(auction.buyer, self.admin)
+        self.assertIsNotNone(auction.closed_at)
+        self.assertIsNone(closed.closed_at)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_estimated_count_paginator(self):
+        from django.db import connection
+
+        from auctions.pagination import EstimatedCountPaginator, estimated_count
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimated_count(Auction), 3)
+        Auction.objects.filter(pk=Auction.objects.first().pk).delete()
+        with mock.patch('auctions.pagination.ESTIMATE_THRESHOLD', 3):
+            self.assertEqual(EstimatedCountPaginator(Auction.objects.order_by('pk'), 10).count, 3)
+            self.assertEqual(EstimatedCountPaginator(Auction.objects.filter(active=True).order_by('pk'), 10).count, 2)
+        self.assertEqual(EstimatedCountPaginator(Auction.objects.order_by('pk'), 10).count, 2)
+
+class TrendingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate()
+        set_store(InMemoryScores())
+        self.addCleanup(set_store, None)
+        self.seller = User.objects.create_user(username='seller', password='pass123')
+        self.bidder = User.objects.create_user(username='bidder', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        self.hot, self.watched, self.quiet = [
+            Auction.objects.create(
+                title=title, author=self.seller, starting_bid=Decimal('1.00'), image='images/a.png', category=category,
+            )
+            for title in ('Hot book', 'Watched book', 'Quiet book')
+        ]
+
+    def test_scores_follow_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(self.hot.pk, self.bidder, Decimal('2.00'))
+            place_bid(self.hot.pk, self.bidder, Decimal('3.00'))
+            place_bid(self.watched.pk, self.bidder, Decimal('2.00'))
+            toggle_watch(self.seller, self.watched.pk)
+            toggle_watch(self.bidder, self.quiet.pk)
+            toggle_watch(self.bidder, self.quiet.pk)
+        store = get_store()
+        self.assertEqual(store.top(BIDS, 10), [(self.hot.pk, 2), (self.watched.pk, 1)])
+        self.assertEqual(store.top(WATCHES, 10), [(self.watched.pk, 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.seller)
+            self.client.get(reverse('auction_close', args=[self.hot.pk]))
+        self.assertEqual(store.top(BIDS, 10), [(self.watched.pk, 1)])
+
+    def test_store_errors_are_logged_not_raised(self):
+        store = mock.Mock(spec=InMemoryScores)
+        store.incr.side_effect = store.remove.side_effect = ConnectionError
+        set_store(store)
+        self.client.force_login(self.seller)
+        with self.assertLogs('auctions.trending', 'ERROR') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                place_bid(self.hot.pk, self.bidder, Decimal('2.00'))
+                toggle_watch(self.seller, self.watched.pk)
+                response = self.client.get(reverse('auction_close', args=[self.hot.pk]))
+        self.assertEqual(len(logs.output), 3)
+        self.assertEqual(response.status_code, 302)
+
+    def test_update_trending_decays_bids_and_recounts_watches(self):
+        store = get_store()
+        store.incr(BIDS, self.hot.pk, 4)
+        store.incr(BIDS, self.quiet.pk, 0.01)
+        store.incr(WATCHES, self.quiet.pk, 7)
+        Watch.objects.create(auction=self.watched, user=self.bidder)
+        update_trending()
+        (auction_id, score), = store.top(BIDS, 10)
+        self.assertEqual(auction_id, self.hot.pk)
+        self.assertAlmostEqual(score, 4 * 0.5 ** (1 / 12))
+        self.assertEqual(store.top(WATCHES, 10), [(self.watched.pk, 1)])
+
+    def test_index_sections(self):
+        store = get_store()
+        store.incr(BIDS, self.quiet.pk, 1)
+        store.incr(BIDS, self.hot.pk, 3)
+        store.incr(WATCHES, self.watched.pk, 2)
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['trending'], [self.hot, self.quiet])
+        self.assertEqual(response.context['most_watched'], [self.watched])
+        self.assertContains(response, 'Most watched')
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('index'))
+        response = self.client.get(reverse('index'), {'page': 1})
+        self.assertNotIn('trending', response.context)
+
+class JsonApiTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        category_registry.invalidate()
+        self.seller = User.objects.create_user(username='seller', password='pass123')
+        self.bidder = User.objects.create_user(username='bidder', password='pass123')
+        self.category = Category.objects.create(category_name='Board games')
+        self.auction = Auction.objects.create(
+            title='Chess set', author=self.seller, starting_bid=Decimal('5.00'), image='images/a.png',
+            category=self.category,
+        )
+        self.url = reverse('api_auction', args=[self.auction.pk])
+
+    def test_detail_and_field_selection(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['title'], 'Chess set')
+        self.assertEqual(data['category'], 'Board games')
+        self.assertEqual(data['starting_bid'], '5.00')
+        self.assertIsNone(data['current_bid'])
+
+        response = self.client.get(self.url, {'fields': 'current_bid,bid_count'})
+        self.assertEqual(response.json(), {'current_bid': None, 'bid_count': 0})
+        response = self.client.get(self.url, {'fields': 'current_bid,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+        self.assertEqual(self.client.get(reverse('api_auction', args=[0])).status_code, 404)
+
+    def test_conditional_get(self):
+        response = self.client.get(self.url, {'fields': 'current_bid'})
+        etag = response.headers['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'fields': 'current_bid'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertNotEqual(self.client.get(self.url).headers['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(self.auction.pk, self.bidder, '7.50')
+        response = self.client.get(self.url, {'fields': 'current_bid'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'current_bid': '7.50'})
+        last_modified = response.headers['Last-Modified']
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_bid_history(self):
+        for amount in ('6.00', '7.00', '8.00'):
+            place_bid(self.auction.pk, self.bidder, amount)
+        url = reverse('api_auction_bids', args=[self.auction.pk])
+        with mock.patch('auctions.api.PAGE_SIZE', 2):
+            data = self.client.get(url).json()
+            self.assertEqual([bid['amount'] for bid in data['results']], ['8.00', '7.00'])
+            data = self.client.get(data['next']).json()
+        self.assertEqual([bid['amount'] for bid in data['results']], ['6.00'])
+        self.assertIsNone(data['next'])
+        self.assertEqual(data['results'][0]['user'], 'bidder')
+
+    def test_listing_and_categories(self):
+        Auction.objects.create(
+            title='Guitar', author=self.seller, starting_bid=Decimal('50.00'), image='images/b.png',
+            category=Category.objects.create(category_name='Music'),
+        )
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('api_auctions'), {'fields': 'id,title'})
+        self.assertEqual([item['title'] for item in response.json()['results']], ['Guitar', 'Chess set'])
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'title'})
+        etag = response.headers['ETag']
+        response = self.client.get(reverse('api_auctions'), {'fields': 'id,title'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        categories = self.client.get(reverse('api_categories')).json()['results']
+        board_games = next(category for category in categories if category['name'] == 'Board games')
+        data = self.client.get(board_games['auctions']).json()
+        self.assertEqual([item['title'] for item in data['results']], ['Chess set'])
+        self.assertEqual(self.client.get(reverse('api_auctions'), {'category': 'Nope'}).status_code, 404)
+
+class BulkImportExportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate()
+        self.seller = User.objects.create_user(username='seller', password='pass123')
+        self.bidder = User.objects.create_user(username='bidder', password='pass123')
+        Category.objects.create(category_name='Books')
+        Category.objects.create(category_name='Music')
+        self.ends_at = (timezone.now() + timedelta(days=3)).isoformat()
+
+    def upload(self, name, content, **extra):
+        self.client.force_login(self.seller)
+        upload = ContentFile(content.encode(), name=name)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('auction_import'), {'file': upload, **extra})
+
+    def test_csv_import_reports_rejected_rows(self):
+        rows = [
+            'title,description,starting_bid,category,ends_at',
+            f'Novel,Hardback,12.50,Books,{self.ends_at}',
+            'Vinyl,,0,Music,',
+            'Poster,Framed,3.00,Posters,',
+            'Songbook,Spiral bound,4.00,Music,',
+        ]
+        category_registry.all()
+        with mock.patch('auctions.bulk.IMPORT_BATCH_SIZE', 2), CaptureQueriesContext(connection) as queries:
+            response = self.upload('auctions.csv', '\n'.join(rows))
+        # Categories come from the registry: one INSERT per batch is the only auction or category query.
+        statements = [
+            query['sql'].split()[0] for query in queries
+            if 'auctions_auction' in query['sql'] or 'auctions_category' in query['sql']
+        ]
+        self.assertEqual(statements, ['INSERT', 'INSERT'])
+        report = response.json()
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4])
+        self.assertIn('starting_bid', report['errors'][0]['errors'])
+        self.assertEqual(report['errors'][1]['errors'], {'category': ['Unknown category.']})
+        novel = Auction.objects.get(title='Novel')
+        self.assertEqual((novel.author, novel.category.category_name, novel.starting_bid),
+                         (self.seller, 'Books', Decimal('12.50')))
+
+    def test_jsonl_import(self):
+        lines = [
+            json.dumps({'title': 'Novel', 'starting_bid': 5, 'category': 'Books', 'description': 'Paperback'}),
+            '',
+            '{"title": "Broken"',
+            json.dumps(['not', 'an', 'object']),
+        ]
+        report = self.upload('auctions.txt', '\n'.join(lines), format='jsonl').json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4])
+        self.assertEqual(self.upload('auctions.xml', '').status_code, 400)
+
+    def test_import_command(self):
+        path = os.path.join(tempfile.mkdtemp(), 'auctions.jsonl')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as f:
+            for row in ({'title': 'Novel', 'starting_bid': '5.00'}, {'title': 'Nothing'}):
+                f.write(json.dumps({'description': 'Used', 'category': 'Books', **row}) + '\n')
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_auctions', path, author='seller', stdout=stdout, stderr=stderr)
+        self.assertIn('Imported 1 auctions; rejected 1 rows.', stdout.getvalue())
+        self.assertIn('Line 2: starting_bid:', stderr.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('import_auctions', path, author='nobody')
+
+    def test_export_round_trip(self):
+        category = Category.objects.get(category_name='Books')
+        auction = Auction.objects.create(
+            title='Novel, signed', description='First "edition"', author=self.seller, starting_bid=Decimal('5.00'),
+            image='images/a.png', category=category,
+        )
+        Auction.objects.create(
+            title='Other', author=self.bidder, starting_bid=Decimal('1.00'), image='', category=category,
+        )
+        place_bid(auction.pk, self.bidder, '6.00')
+        place_bid(auction.pk, self.bidder, '7.00')
+
+        self.client.force_login(self.seller)
+        response = self.client.get(reverse('auction_export'))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['title'], row['description'], row['current_bid']) for row in rows],
+                         [('Novel, signed', 'First "edition"', '7.00')])
+
+        response = self.client.get(reverse('auction_export'), {'what': 'bids', 'format': 'jsonl'})
+        bids = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(bid['user'], bid['amount']) for bid in bids], [('bidder', '6.00'), ('bidder', '7.00')])
+
+        stdout = StringIO()
+        call_command('export_auctions', 'auctions', format='jsonl', stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 2)
+
+    def test_bid_export_interleaves_archived_bids_by_auction(self):
+        category = Category.objects.get(category_name='Books')
+        old, new = (
+            Auction.objects.create(
+                title=title, author=self.seller, starting_bid=Decimal('1.00'), image='', category=category,
+            )
+            for title in ('Old', 'New')
+        )
+        bid = Bid.objects.create(auction=new, user=self.bidder, amount=Decimal('2.00'))
+        ArchivedBid.objects.create(
+            id=bid.pk + 1, auction=old, user=self.bidder, amount=Decimal('3.00'), created=timezone.now(),
+        )
+        rows = list(bid_rows(Auction.objects.all()))
+        self.assertEqual([(row['auction_id'], row['amount']) for row in rows],
+                         [(old.pk, Decimal('3.00')), (new.pk, Decimal('2.00'))])
+
+class SeedDataTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate()
+        call_command(
+            'seed_data', seed=7, users=20, categories=4, auctions=60, bids=300, comments=100, watches=50,
+            batch_size=25, stdout=StringIO(),
+        )
+
+    def test_dataset_is_consistent(self):
+        self.assertEqual(Auction.objects.count(), 60)
+        self.assertEqual(Category.objects.count(), 4)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertGreater(Bid.objects.count(), 0)
+        for auction in Auction.objects.filter(bid_count__gt=0).select_related('leading_bid')[:20]:
+            self.assertEqual(auction.bid_count, auction.bid_set.count())
+            self.assertEqual(auction.current_bid, auction.leading_bid.amount)
+            self.assertNotEqual(auction.leading_bid.user_id, auction.author_id)
+        self.assertFalse(Auction.objects.filter(active=False, closed_at__isnull=True).exists())
+        self.assertTrue(Auction.objects.filter(active=False).exists())
+
+    def test_dataset_is_reproducible(self):
+        titles = list(Auction.objects.order_by('pk').values_list('title', 'starting_bid', 'bid_count'))
+        Watch.objects.all().delete()
+        for model in (Comment, Bid, Auction, User):
+            model.objects.all().delete()
+        call_command(
+            'seed_data', seed=7, users=20, categories=4, auctions=60, bids=300, comments=100, watches=50,
+            batch_size=25, stdout=StringIO(),
+        )
+        self.assertEqual(list(Auction.objects.order_by('pk').values_list('title', 'starting_bid', 'bid_count')), titles)
+
+    def test_benchmarks_export_json(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = run_benchmarks(repeat=2, warmup=1)
+        self.assertEqual(
+            set(report['results']), {'index', 'index_authenticated', 'category', 'search', 'auction', 'bid', 'close'},
+        )
+        self.assertEqual(report['dataset']['auctions'], 60)
+        self.assertEqual(report['results']['index']['runs'], 2)
+        json.dumps(report)
+
+    def test_benchmark_command_writes_report(self):
+        output = os.path.join(tempfile.mkdtemp(), 'report.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        call_command('run_benchmarks', scenario=['index', 'auction'], repeat=2, warmup=0, output=output,
+                     stdout=StringIO())
+        out = StringIO()
+        call_command('run_benchmarks', scenario=['index'], repeat=2, warmup=0, compare=output, stdout=out)
+        with open(output) as f:
+            self.assertEqual(set(json.load(f)['results']), {'index', 'auction'})
+        self.assertIn('index:', out.getvalue())
+        self.assertIn('%)', out.getvalue())
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate()
+        self.seller = User.objects.create_user(username='seller', password='pass123')
+        self.bidder = User.objects.create_user(username='bidder', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        now = timezone.now()
+        self.old = self.create_auction(category, closed_at=now - timedelta(days=120))
+        self.older = self.create_auction(category, closed_at=now - timedelta(days=200))
+        self.recent = self.create_auction(category, closed_at=now - timedelta(days=10))
+        self.open = self.create_auction(category, closed_at=None)
+
+    def create_auction(self, category, closed_at):
+        auction = Auction.objects.create(
+            title='Book', author=self.seller, starting_bid=Decimal('1.00'), image='images/a.png', category=category,
+        )
+        place_bid(auction.pk, self.bidder, Decimal('2.00'))
+        place_bid(auction.pk, self.bidder, Decimal('3.00'))
+        Comment.objects.create(user=self.bidder, auction=auction, comment=f'Comment on {auction.pk}')
+        if closed_at:
+            Auction.objects.filter(pk=auction.pk).update(active=False, closed_at=closed_at, buyer=self.bidder)
+        return auction
+
+    def test_moves_rows_of_old_closed_auctions(self):
+        bid_ids = set(Bid.objects.filter(auction=self.old).values_list('pk', flat=True))
+        self.assertEqual(archive_closed_auctions(timedelta(days=90)), (2, 4, 2))
+
+        self.assertFalse(Bid.objects.filter(auction__in=[self.old, self.older]).exists())
+        self.assertFalse(Comment.objects.filter(auction__in=[self.old, self.older]).exists())
+        self.assertEqual(set(ArchivedBid.objects.filter(auction=self.old).values_list('pk', flat=True)), bid_ids)
+        self.assertEqual(Bid.objects.filter(auction__in=[self.recent, self.open]).count(), 4)
+        self.old.refresh_from_db()
+        self.assertIsNotNone(self.old.archived_at)
+        self.assertIsNone(self.old.leading_bid_id)
+        self.assertEqual(self.old.current_bid, Decimal('3.00'))
+        amounts = [bid.amount for bid in bids_for(self.old).order_by('amount')]
+        self.assertEqual(amounts, [Decimal('2.00'), Decimal('3.00')])
+
+    def test_archived_auction_page_reads_archive(self):
+        call_command('archive_auctions', days=90, batch_size=1, stdout=StringIO())
+        self.assertEqual(ArchivedComment.objects.count(), 2)
+        response = self.client.get(reverse('auction', args=[self.old.pk]))
+        self.assertContains(response, f'Comment on {self.old.pk}')
+        response = self.client.get(reverse('auction_comments', args=[self.old.pk]))
+        self.assertContains(response, f'Comment on {self.old.pk}')
+
+    def test_archival_resumes_where_it_stopped(self):
+        with mock.patch('auctions.archive.time.monotonic', side_effect=[0, 0, 10]):
+            self.assertEqual(archive_closed_auctions(timedelta(days=90), batch_size=1, time_limit=5)[0], 1)
+        self.assertEqual(archive_closed_auctions(timedelta(days=90), batch_size=1)[0], 1)
+        self.assertEqual(Auction.objects.filter(archived_at__isnull=False).count(), 2)
+
+    def test_closing_records_closed_at(self):
+        self.client.force_login(self.seller)
+        self.client.get(reverse('auction_close', args=[self.open.pk]))
+        self.open.refresh_from_db()
+        self.assertIsNotNone(self.open.closed_at)
+
+        with mock.patch('django.utils.timezone.now', return_value=self.open.closed_at + timedelta(days=1)):
+            self.client.get(reverse('auction_close', args=[self.open.pk]))
+        closed_at = self.open.closed_at
+        self.open.refresh_from_db()
+        self.assertEqual(self.open.closed_at, closed_at)
+
+    def test_partitioning_requires_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command('partition_bids', stdout=StringIO())
+
+
+class CategoryRegistryTestCase(TestCase):
+    def setUp(self):
+        category_registry.invalidate()
+
+    def test_warm_registry_makes_no_queries(self):
+        Category.objects.create(category_name='Books')
+        self.client.get(reverse('index'))
+        with self.assertNumQueries(0):
+            self.assertEqual([c.category_name for c in category_registry.all()], ['Books'])
+
+    def test_save_and_delete_invalidate(self):
+        books = Category.objects.create(category_name='Books')
+        self.assertEqual(category_registry.get('Books'), books)
+        with self.captureOnCommitCallbacks(execute=True):
+            books.category_name = 'Comics'
+            books.save()
+            # Readers keep the cached rows until the transaction commits.
+            self.assertEqual(category_registry.get('Books'), books)
+        self.assertIsNone(category_registry.get('Books'))
+        self.assertEqual(category_registry.get('Comics'), books)
+        with self.captureOnCommitCallbacks(execute=True):
+            books.delete()
+        self.assertEqual(category_registry.all(), [])
+
+    def test_local_tier_expires(self):
+        local = LocalTTLCache(maxsize=2, ttl=60)
+        local.set('a', 1)
+        local.set('b', 2)
+        local.set('c', 3)
+        self.assertIsNone(local.get('a'))
+        self.assertEqual(local.get('c'), 3)
+        with mock.patch('auctions.categories.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(local.get('c'))
+
+
+class CursorPaginationTestCase(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='seller', password='pass123')
+        category = Category.objects.create(category_name='Books')
+        created = timezone.now()
+        # Pairs of auctions share a timestamp so the id tie-breaker is exercised.
+        self.auctions = [
+            Auction.objects.create(
+                title=f'Book {i}', author=author, starting_bid=Decimal('1.00'), image='images/a.png',
+                category=category, created=created - timedelta(minutes=i // 2),
+            )
+            for i in range(15)
+        ]
+        self.expected = sorted(self.auctions, key=lambda a: (a.created, a.pk), reverse=True)
+
+    def test_walk_forward_and_back(self):
+        paginator = CursorPaginator(Auction.objects.all(), 4)
+        page = paginator.page()
+        self.assertFalse(page.has_previous())
+        pages = [page]
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            pages.append(page)
+        self.assertEqual([a for p in pages for a in p], self.expected)
+        self.assertEqual([len(p) for p in pages], [4, 4, 4, 3])
+
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            self.assertEqual(page.object_list, pages.pop(-2).object_list)
+        self.assertEqual(page.object_list, self.expected[:4])
+
+    def test_index_view_uses_cursor_links(self):
+        response = self.client.get(reverse('index'))
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'?cursor={next_cursor}')
+        response = self.client.get(reverse('index'), {'cursor': next_cursor})
+        self.assertEqual(list(response.context['auctions']), self.expected[6:12])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('index'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_sorting_by_bids_keeps_offset_pagination(self):
+        response = self.client.get(reverse('index'), {'sort': 'bids', 'page': 2})
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+
+class ListingQueryPlanTestCase(TestCase):
+    auctions = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='seller', password='pass123')
+        categories = Category.objects.bulk_create(Category(category_name=f'Category {i}') for i in range(10))
+        now = timezone.now()
+        Auction.objects.bulk_create(
+            Auction(
+                title=f'Auction {i}', author=cls.user, starting_bid=Decimal('1.00'), image='images/a.png',
+                category=categories[i % 10], active=i % 5 != 0, buyer=cls.user if i % 5 == 0 else None,
+                bid_count=i % 13, created=now - timedelta(minutes=i),
+            )
+            for i in range(cls.auctions)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        category_registry.invalidate()
+        category_registry.all()
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan on auctions_auction', plan)
+        else:
+            self.assertNotRegex(plan, r'SCAN auctions_auction(?! USING)')
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def assertCursorPageUsesIndex(self, url, queries=1):
+        response = self.client.get(url)
+        for _ in range(3):
+            response = self.client.get(url, {'cursor': response.context['page_obj'].next_cursor})
+        cursor = response.context['page_obj'].next_cursor
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, {'cursor': cursor})
+        self.assertEqual(len(response.context['auctions']), 6)
+        self.assertUsesIndex(response.context['paginator'].page_queryset(cursor)[0][:7])
+        previous_cursor = response.context['page_obj'].previous_cursor
+        self.assertUsesIndex(response.context['paginator'].page_queryset(previous_cursor)[0][:7])
+
+    def test_index(self):
+        self.assertCursorPageUsesIndex(reverse('index'))
+
+    def test_index_sorted_by_bids(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('index'), {'sort': 'bids', 'page': 50})
+        self.assertUsesIndex(response.context['page_obj'].object_list)
+
+    def test_category(self):
+        # allow_empty = False adds an EXISTS query.
+        self.assertCursorPageUsesIndex(reverse('category_view', args=['Category 3']), queries=2)
+
+    def test_purchases(self):
+        self.client.force_login(self.user)
+        # Includes loading the user, which the login evicted from the cache.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('purchases'), {'page': 20})
+        self.assertUsesIndex(response.context['page_obj'].object_list)
+
+    def test_search(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse('search'), {'q': 'Auction 12'})
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='seller', password='pass123')
+        self.category = Category.objects.create(category_name='Books')
+
+    def create_auction(self, title, description='', **kwargs):
+        return Auction.objects.create(
+            title=title, description=description, author=self.author, starting_bid=Decimal('1.00'),
+            image='images/a.png', category=self.category, **kwargs
+        )
+
+    def test_title_matches_rank_above_description_matches(self):
+        in_description = self.create_auction('Old book', 'A guitar songbook')
+        in_title = self.create_auction('Guitar', 'Six strings')
+        self.create_auction('Piano', 'Keys')
+        results = list(get_search_backend().search('guitar'))
+        self.assertEqual(results, [in_title, in_description])
+
+    def test_prefix_matching(self):
+        auction = self.create_auction('Telescope', 'Refractor')
+        self.assertEqual(list(get_search_backend().search('teles refr')), [auction])
+        self.assertEqual(list(get_search_backend().search('"); DROP')), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        auction = self.create_auction('Lamp', 'Brass')
+        auction.title = 'Chandelier'
+        auction.save()
+        self.assertEqual(list(get_search_backend().search('lamp')), [])
+        self.assertEqual(list(get_search_backend().search('chandelier')), [auction])
+        auction.delete()
+        self.assertEqual(list(get_search_backend().search('chandelier')), [])
+
+    def test_rebuild_command(self):
+        auction = self.create_auction('Camera', 'Film')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(list(get_search_backend().search('camera')), [auction])
+
+    def test_search_view_is_paginated_and_skips_closed_auctions(self):
+        for i in range(8):
+            self.create_auction(f'Vase {i}')
+        self.create_auction('Vase closed', active=False)
+        response = self.client.get(reverse('search'), {'q': 'vase'})
+        self.assertEqual(response.context['paginator'].count, 8)
+        self.assertEqual(len(response.context['auctions']), 6)
+        self.assertEqual(response.context['page_query'], 'q=vase')
+
+    def test_empty_query(self):
+        self.create_auction('Vase')
+        response = self.client.get(reverse('search'))
+        self.assertEqual(len(response.context['auctions']), 0)
+
+
+class ConcurrentBidTestCase(TransactionTestCase):
+    threads = 16
+
+    def test_highest_bid_always_wins(self):
+        category = Category.objects.create(category_name='Books')
+        users = [User.objects.create_user(username=f'user{i}', password='pass123') for i in range(self.threads)]
+        auction = Auction.objects.create(
+            title='Book', description='Old book', author=users[0], starting_bid=Decimal('1.00'),
+            image='images/book.png', category=category,
+        )
+        amounts = [Decimal(i + 1) for i in range(self.threads)]
+        random.Random(0).shuffle(amounts)
+        barrier = threading.Barrier(self.threads)
+        results = []
+
+        def bid(user, amount):
+            try:
+                barrier.wait()
+                results.append(place_bid(auction.pk, user, amount))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=bid, args=args) for args in zip(users, amounts)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        auction.refresh_from_db()
+        accepted = sorted(r.current_bid for r in results if r.status == ACCEPTED)
+        self.assertEqual(len(results), self.threads)
+        self.assertEqual(auction.current_bid, max(amounts))
+        self.assertEqual(accepted[-1], max(amounts))
+        self.assertEqual(Bid.objects.filter(auction=auction).count(), len(accepted))
+        self.assertEqual(len(set(accepted)), len(accepted))
+
+
+@override_settings(AUCTIONS_READ_REPLICAS=['replica'])
+class ReplicaRoutingTestCase(TestCase):
+    """The primary is the test database; the replica is a second SQLite file that never receives its writes."""
+
+    @classmethod
+    def setUpClass(cls):
+        import sqlite3
+
+        from django.db import connections
+
+        cls.replica_dir = tempfile.mkdtemp()
+        replica_path = os.path.join(cls.replica_dir, 'replica.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(replica_path)
+        connection.connection.backup(target)
+        target.close()
+        super().setUpClass()
+        # Registered after setUpClass, so the replica is neither blocked nor wrapped in the test transaction.
+        connections.settings['replica'] = {**connections.settings['default'], 'NAME': replica_path}
+
+        seller = User.objects.db_manager('replica').create_user(username='seller', password='pass123')
+        category = Category.objects.using('replica').create(category_name='Lamps')
+        Auction.objects.using('replica').create(
+            title='Replica lamp', author=seller, starting_bid=Decimal('1.00'), image='images/a.png', category=category,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        from django.db import connections
+
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.replica_dir)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate()
+        self.user = User.objects.create_user(username='seller', password='pass123')
+        self.auction = Auction.objects.create(
+            title='Primary lamp', author=self.user, starting_bid=Decimal('1.00'), image='images/a.png',
+            category=Category.objects.create(category_name='Lamps'),
+        )
+
+    def get_index(self):
+        cache.clear()
+        return self.client.get(reverse('index'))
+
+    def test_read_only_pages_use_replica(self):
+        response = self.get_index()
+        self.assertContains(response, 'Replica lamp')
+        self.assertNotContains(response, 'Primary lamp')
+
+    async def test_async_views_use_replica(self):
+        index = next(pattern for pattern in urlpatterns if pattern.name == 'index')
+        with mock.patch.object(index, 'callback', async_views.AuctionsHome.as_view()):
+            await sync_to_async(cache.clear)()
+            response = await self.async_client.get(reverse('index'))
+        self.assertContains(response, 'Replica lamp')
+        self.assertNotContains(response, 'Primary lamp')
+
+    def test_other_views_use_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('watchlist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_writes_pin_reads_to_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('comment', args=[self.auction.pk]), {'comment': 'Still available?'})
+        self.assertEqual(response.cookies['auctions_primary']['max-age'], 5)
+        self.assertContains(self.get_index(), 'Primary lamp')
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        from django.db import connections
+
+        from auctions import routers
+
+        replica = connections.settings['replica']
+        broken = {**replica, 'NAME': os.path.join(self.replica_dir, 'missing', 'replica.sqlite3')}
+        connections['replica'].close()
+        with mock.patch.dict(connections.settings, {'replica': broken}):
+            del connections['replica']
+            try:
+                self.assertContains(self.get_index(), 'Primary lamp')
+                self.assertIn('replica', routers._replica_down_until)
+            finally:
+                routers._replica_down_until.clear()
+                del connections['replica']
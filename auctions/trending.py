@@ -0,0 +1,200 @@
+"""
+Trending and most watched auctions.
+
+Two scores per active auction are kept in sorted sets:
+
+- bids: bid velocity. Every accepted bid adds 1, and decay_scores(), run by
+  Celery beat every DECAY_INTERVAL seconds, scales all scores down so that
+  a bid counts half after HALF_LIFE seconds.
+- watches: watcher count. toggle_watch adjusts it as users watch and unwatch;
+  sync_watch_counts() recounts it from the database on the same schedule,
+  which also picks up the watches place_bid adds implicitly.
+
+Closing an auction removes it from both. The sets live in Redis when the
+default cache is django_redis and in process memory otherwise (tests, local
+development). The home page reads them through sections(), which caches the
+resulting auctions for SECTIONS_TIMEOUT seconds.
+
+Scores are best-effort: the updates made after a bid, watch or close commits
+log store errors on the auctions.trending logger instead of failing the
+request.
+"""
+import logging
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Auction
+
+logger = logging.getLogger('auctions.trending')
+
+BIDS = 'auctions:trending:bids'
+WATCHES = 'auctions:trending:watches'
+SECTIONS_KEY = 'auctions:trending:sections'
+
+HALF_LIFE = 60 * 60
+DECAY_INTERVAL = 5 * 60
+# Decayed scores below this are dropped so the set only holds recent activity.
+MIN_SCORE = 0.01
+SECTION_SIZE = 6
+SECTIONS_TIMEOUT = 30
+# Watch counts are recounted for this many auctions.
+WATCH_SYNC_SIZE = 1000
+
+
+class InMemoryScores:
+    """Sorted sets in a dict, for a single process. Safe to call from any thread."""
+
+    def __init__(self):
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key, member, amount=1):
+        with self._lock:
+            scores = self._sets.setdefault(key, {})
+            scores[member] = scores.get(member, 0) + amount
+
+    def remove(self, key, *members):
+        with self._lock:
+            for member in members:
+                self._sets.get(key, {}).pop(member, None)
+
+    def top(self, key, count):
+        """The count highest-scoring members with a positive score, as (member, score) pairs."""
+        with self._lock:
+            scores = [(member, score) for member, score in self._sets.get(key, {}).items() if score > 0]
+        return sorted(scores, key=lambda item: (-item[1], -item[0]))[:count]
+
+    def decay(self, key, factor, minimum):
+        with self._lock:
+            self._sets[key] = {
+                member: score * factor for member, score in self._sets.get(key, {}).items()
+                if score * factor >= minimum
+            }
+
+    def replace(self, key, scores):
+        with self._lock:
+            self._sets[key] = dict(scores)
+
+
+class RedisScores:
+    """Sorted sets in Redis, shared by every process."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def incr(self, key, member, amount=1):
+        self.client.zincrby(key, amount, member)
+
+    def remove(self, key, *members):
+        if members:
+            self.client.zrem(key, *members)
+
+    def top(self, key, count):
+        items = self.client.zrevrangebyscore(key, '+inf', '(0', start=0, num=count, withscores=True)
+        return [(int(member), score) for member, score in items]
+
+    def decay(self, key, factor, minimum):
+        with self.client.pipeline() as pipe:
+            # ZUNIONSTORE of a single set with a weight multiplies every score in place.
+            pipe.zunionstore(key, {key: factor})
+            pipe.zremrangebyscore(key, '-inf', f'({minimum}')
+            pipe.execute()
+
+    def replace(self, key, scores):
+        with self.client.pipeline() as pipe:
+            pipe.delete(key)
+            if scores:
+                pipe.zadd(key, dict(scores))
+            pipe.execute()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                from django_redis import get_redis_connection
+
+                _store = RedisScores(get_redis_connection('default'))
+            except (ImportError, NotImplementedError):
+                _store = InMemoryScores()
+        return _store
+
+
+def set_store(store):
+    """Replace the process store, e.g. with a fresh InMemoryScores in tests."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def update_on_commit(update):
+    """Call update(store) once the transaction commits; a store error is logged, never raised."""
+    def run():
+        try:
+            update(get_store())
+        except Exception:
+            logger.exception('Could not update trending scores')
+
+    transaction.on_commit(run)
+
+
+def record_bid_on_commit(auction_id):
+    update_on_commit(lambda store: store.incr(BIDS, auction_id))
+
+
+def record_watch_on_commit(auction_id, watching):
+    update_on_commit(lambda store: store.incr(WATCHES, auction_id, 1 if watching else -1))
+
+
+def forget_on_commit(auction_ids):
+    """Drop closed auctions from both sets."""
+    auction_ids = list(auction_ids)
+
+    def forget(store):
+        store.remove(BIDS, *auction_ids)
+        store.remove(WATCHES, *auction_ids)
+
+    update_on_commit(forget)
+
+
+def decay_scores(elapsed=DECAY_INTERVAL):
+    get_store().decay(BIDS, 0.5 ** (elapsed / HALF_LIFE), MIN_SCORE)
+
+
+def sync_watch_counts():
+    """Recount watchers of the most watched active auctions."""
+    counts = (
+        Auction.objects.filter(active=True)
+        .annotate(watch_count=Count('watchers'))
+        .filter(watch_count__gt=0)
+        .order_by('-watch_count')
+        .values_list('pk', 'watch_count')[:WATCH_SYNC_SIZE]
+    )
+    get_store().replace(WATCHES, counts)
+
+
+def sections():
+    """
+    The home page's trending and most watched auctions, as a dict of lists.
+    Both come from one query, cached for SECTIONS_TIMEOUT seconds.
+    """
+    result = cache.get(SECTIONS_KEY)
+    if result is None:
+        store = get_store()
+        ranked = {
+            'trending': [pk for pk, _ in store.top(BIDS, SECTION_SIZE)],
+            'most_watched': [pk for pk, _ in store.top(WATCHES, SECTION_SIZE)],
+        }
+        ids = {pk for pks in ranked.values() for pk in pks}
+        auctions = Auction.objects.filter(active=True).in_bulk(ids) if ids else {}
+        result = {name: [auctions[pk] for pk in pks if pk in auctions] for name, pks in ranked.items()}
+        cache.set(SECTIONS_KEY, result, SECTIONS_TIMEOUT)
+    return result
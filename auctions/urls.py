@@ -1,20 +1,33 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import api, async_views, views
+
+# Read-heavy pages can be served by their async versions under ASGI.
+read_views = async_views if getattr(settings, 'AUCTIONS_ASYNC_VIEWS', False) else views
 
 urlpatterns = [
-    path('', views.AuctionsHome.as_view(), name='index'),
+    path('', read_views.AuctionsHome.as_view(), name='index'),
     path('new', views.NewAuction.as_view(), name='new'),
+    path('import', views.AuctionImport.as_view(), name='auction_import'),
+    path('export', views.AuctionExport.as_view(), name='auction_export'),
     path('register', views.register, name='register'),
     path('login', views.MyLoginView.as_view(), name='login'),
     path('logout', views.MyLogoutView.as_view(), name='logout'),
-    path('search', views.AuctionSearch.as_view(), name='search'),
+    path('search', read_views.AuctionSearch.as_view(), name='search'),
     path('purchases', views.Purchases.as_view(), name='purchases'),
     path('watchlist', views.AuctionWatchlist.as_view(), name='watchlist'),
-    path('auction/<int:auction_id>', views.AuctionPage.as_view(), name='auction'),
+    path('auction/<int:auction_id>', read_views.AuctionPage.as_view(), name='auction'),
     path('auction/<int:auction_id>/bid', views.AuctionBid.as_view(), name='auction_bid'),
     path('auction/<int:auction_id>/comment', views.CommentCreate.as_view(), name='comment'),
+    path('auction/<int:auction_id>/comments', views.AuctionComments.as_view(), name='auction_comments'),
     path('auction/<int:auction_id>/close', views.AuctionClose.as_view(), name='auction_close'),
-    path('categories/<str:category_name>', views.AuctionCategory.as_view(), name='category_view'),
+    path('auction/<int:auction_id>/events', views.AuctionEvents.as_view(), name='auction_events'),
+    path('categories/<str:category_name>', read_views.AuctionCategory.as_view(), name='category_view'),
     path('watchlist/<int:auction_id>/watch', views.WatchlistEdit.as_view(), name='watchlist_edit'),
+    path('metrics', views.Metrics.as_view(), name='metrics'),
+    path('api/auctions', api.AuctionList.as_view(), name='api_auctions'),
+    path('api/auctions/<int:auction_id>', api.AuctionDetail.as_view(), name='api_auction'),
+    path('api/auctions/<int:auction_id>/bids', api.AuctionBids.as_view(), name='api_auction_bids'),
+    path('api/categories', api.CategoryList.as_view(), name='api_categories'),
 ]
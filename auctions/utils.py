@@ -1,6 +1,10 @@
+from django.http import Http404
 from django.urls import reverse_lazy
 
-from .models import Auction, Category
+from .categories import category_registry
+from .models import ArchivedComment, Auction, Comment
+from .pagination import CursorPaginator, InvalidCursor
+from .watchlist import annotate_watched
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 
@@ -9,13 +13,55 @@ class DataMixin:
     template_name = 'auctions/index.html'
     context_object_name = 'auctions'
     paginate_by = 6
+    cursor_pagination = False
+    sortable = False
+    sort_orderings = {
+        'newest': ('-created', '-id'),
+        'bids': ('-bid_count', '-created', '-id'),
+    }
+
+    def get_ordering(self):
+        return self.sort_orderings.get(self.request.GET.get('sort'), self.sort_orderings['newest'])
+
+    def get_cursor_paginator(self, queryset, page_size):
+        """Return a CursorPaginator when the view opts in and the listing is ordered newest first."""
+        if self.cursor_pagination and tuple(queryset.query.order_by) == CursorPaginator.ordering:
+            return CursorPaginator(queryset, page_size)
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        """Annotate watch status for the listing cards, then paginate by cursor or by page number."""
+        queryset = annotate_watched(queryset, self.request.user)
+        paginator = self.get_cursor_paginator(queryset, page_size)
+        if paginator is None:
+            return super().paginate_queryset(queryset, page_size)
+
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        return paginator, page, page.object_list, page.has_other_pages()
 
     def get_user_context(self, **kwargs):
         context = kwargs
-        categories = Category.objects.all()
-        context['categories'] = categories
+        context['sortable'] = self.sortable
+        page_query = self.request.GET.copy()
+        page_query.pop('page', None)
+        page_query.pop('cursor', None)
+        context['page_query'] = page_query.urlencode()
+        context['categories'] = category_registry.all()
         return context
 
 
+def comment_page(auction_id, cursor=None, per_page=20, archived=False):
+    """
+    Return one keyset page of an auction's active comments, oldest first, with
+    their authors. archived reads them from ArchivedComment instead.
+    """
+    model = ArchivedComment if archived else Comment
+    comments = model.objects.filter(auction_id=auction_id, active=True).select_related('user')
+    return CursorPaginator(comments, per_page, ordering=('created', 'id')).page(cursor)
+
+
 class LoginMixin(LoginRequiredMixin):
     login_url = reverse_lazy('login')
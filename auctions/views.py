@@ -1,32 +1,52 @@
-from decimal import Decimal
+import csv
 
+from django.conf import settings
 from django.contrib.auth import login
 from django.contrib.auth.views import LoginView, LogoutView
-from django.db import IntegrityError
-from django.http import HttpResponseRedirect, HttpResponseForbidden
+from django.db import IntegrityError, transaction
+from django.http import (
+    Http404, HttpResponse, HttpResponseRedirect, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse, reverse_lazy
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
 from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, FormView
 from django.contrib import messages
 
-from .service import send
-from .tasks import send_email
-from .utils import DataMixin, LoginMixin
-from .models import User, Auction, Bid, Comment
+from . import trending
+from .archive import is_archived
+from .bidding import ACCEPTED, place_bid
+from .bulk import FORMATS, UnsupportedFormat, detect_format, export_lines, import_auctions, open_text, read_rows
+from .categories import category_registry
+from .closing import close_auctions
+from .fragments import FRAGMENT_TIMEOUT, get_version
+from .metrics import registry
+from .search import get_search_backend
+from .tasks import queue_winner_notifications
+from .pagination import InvalidCursor
+from .utils import DataMixin, LoginMixin, comment_page
+from .watchlist import annotate_watched, toggle_watch
+from .models import User, Auction, Comment
 from .forms import CommentForm, BidForm, AuctionForm
 
 
 class AuctionsHome(DataMixin, ListView):
     """View for the home page displaying a list of active auctions."""
+    cursor_pagination = True
+    sortable = True
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         c_def = self.get_user_context(title='Auctions')
         context.update(c_def)
+        if 'cursor' not in self.request.GET and 'page' not in self.request.GET:
+            context.update(trending.sections())
         return context
 
     def get_queryset(self):
-        return Auction.objects.filter(active=True)
+        return Auction.objects.filter(active=True).order_by(*self.get_ordering())
 
 
 class MyLoginView(LoginView):
@@ -72,7 +92,6 @@ def register(request):
         # Attempt to create new user
         try:
             user = User.objects.create_user(username, email, password)
-            user.save()
             login(request, user)
         except IntegrityError:
             return render(request, 'auctions/register.html', {
@@ -96,17 +115,16 @@ class AuctionPage(DetailView):
         context = super().get_context_data(**kwargs)
         context['bid_form'] = BidForm()
         context['comment_form'] = CommentForm()
-        context['comments'] = self.object.get_comments.all
-
-        if self.request.user.is_authenticated:
-            if self.object in self.request.user.watchlist.all():
-                self.object.is_watched = True
-            else:
-                self.object.is_watched = False
+        context['comments'] = SimpleLazyObject(
+            lambda: comment_page(self.object.pk, archived=self.object.archived_at is not None)
+        )
+        context['auction_version'] = get_version(self.object.pk)
+        context['fragment_timeout'] = FRAGMENT_TIMEOUT
         return context
 
     def get_queryset(self):
-        return Auction.objects.all().select_related('author', 'category', 'buyer')
+        queryset = Auction.objects.all().select_related('author', 'category', 'buyer')
+        return annotate_watched(queryset, self.request.user)
 
 
 class NewAuction(LoginMixin, CreateView):
@@ -120,12 +138,53 @@ class NewAuction(LoginMixin, CreateView):
         return super().form_valid(form)
 
 
+class AuctionImport(LoginMixin, View):
+    """Upload endpoint creating the current user's auctions from a CSV or JSON Lines file."""
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return JsonResponse({'error': 'Upload the rows as "file".'}, status=400)
+        try:
+            fmt = detect_format(upload.name, request.POST.get('format'))
+        except UnsupportedFormat as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        try:
+            result = import_auctions(read_rows(open_text(upload), fmt), request.user)
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Batches before the unreadable part have been imported.
+            return JsonResponse({'error': f'Unreadable file: {e}'}, status=400)
+        return JsonResponse({
+            'created': result.created,
+            'errors': [{'line': line_number, 'errors': errors} for line_number, errors in result.errors],
+        })
+
+
+class AuctionExport(LoginMixin, View):
+    """Streaming CSV or JSON Lines export of the user's auctions or their bids; staff get every auction."""
+
+    def get(self, request):
+        what = request.GET.get('what', 'auctions')
+        fmt = request.GET.get('format', 'csv')
+        if what not in ('auctions', 'bids') or fmt not in FORMATS:
+            raise Http404('Unknown export.')
+        auctions = Auction.objects.all() if request.user.is_staff else Auction.objects.filter(author=request.user)
+        response = StreamingHttpResponse(export_lines(auctions, what, fmt), content_type=FORMATS[fmt])
+        response.headers['Content-Disposition'] = f'attachment; filename="{what}.{fmt}"'
+        return response
+
+
 class AuctionCategory(DataMixin, ListView):
     """View for displaying a list of auctions in a specific category."""
     allow_empty = False
+    cursor_pagination = True
+    sortable = True
 
     def get_queryset(self):
-        return Auction.objects.filter(category__category_name=self.kwargs['category_name'], active=True)
+        category = category_registry.get(self.kwargs['category_name'])
+        if category is None:
+            return Auction.objects.none()
+        return Auction.objects.filter(category_id=category.pk, active=True).order_by(*self.get_ordering())
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -152,7 +211,7 @@ class Purchases(LoginMixin, DataMixin, ListView):
     """View for displaying a list of auctions that user won."""
 
     def get_queryset(self):
-        return Auction.objects.filter(buyer=self.request.user)
+        return Auction.objects.filter(buyer=self.request.user).order_by('-created')
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -164,15 +223,9 @@ class Purchases(LoginMixin, DataMixin, ListView):
 class WatchlistEdit(LoginMixin, View):
     """View for adding/removing an auction from the user's watchlist."""
     def get(self, request, auction_id):
-        auction = Auction.objects.get(id=auction_id)
-
-        if request.user in auction.watchers.all():
-            auction.watchers.remove(request.user)
-            auction.is_watched = False
-        else:
-            auction.watchers.add(request.user)
-            auction.is_watched = True
-
+        if not Auction.objects.filter(id=auction_id).exists():
+            raise Http404
+        toggle_watch(request.user, auction_id)
         return HttpResponseRedirect(reverse('auction', args=[auction_id]))
 
 
@@ -183,37 +236,26 @@ class AuctionBid(LoginMixin, FormView):
 
     def form_valid(self, form):
         auction_id = self.kwargs['auction_id']
-        auction = get_object_or_404(Auction, id=auction_id)
-        amount = Decimal(form.cleaned_data['amount'])
-
-        if amount >= auction.starting_bid and (auction.current_bid is None or amount > auction.current_bid):
-            auction.current_bid = amount
-            new_bid = form.save(commit=False)
-            new_bid.auction = auction
-            new_bid.user = self.request.user
-            if self.request.user not in auction.watchers.all():
-                auction.watchers.add(self.request.user)
-            new_bid.save()
-            auction.save()
+        try:
+            result = place_bid(auction_id, self.request.user, form.cleaned_data['amount'])
+        except Auction.DoesNotExist:
+            raise Http404
 
-            return HttpResponseRedirect(reverse('auction', args=[auction_id]))
-        else:
+        if result.status != ACCEPTED:
             messages.error(self.request, 'Your bid must be greater than the current price.')
-            return HttpResponseRedirect(reverse('auction', args=[auction_id]))
+        return HttpResponseRedirect(reverse('auction', args=[auction_id]))
 
 
 class AuctionClose(LoginMixin, View):
     """View for closing an auction."""
     def get(self, request, auction_id):
-        auction = get_object_or_404(Auction, id=auction_id)
+        auction = get_object_or_404(Auction.objects.only('author'), id=auction_id)
 
         if request.user == auction.author:
-            auction.active = False
-            if auction.current_bid:
-                auction.buyer = Bid.objects.filter(auction=auction).last().user
-            auction.save()
-            send(auction.buyer.email)
-            send_email.delay(auction.buyer.email)
+            # One conditional UPDATE takes the winner from the row as it is now, so a bid accepted since
+            # the auction was loaded is not lost, and closing a closed auction again changes nothing.
+            with transaction.atomic():
+                close_auctions([auction.pk], notify=queue_winner_notifications)
             return HttpResponseRedirect(reverse('auction', args=[auction_id]))
         else:
             return HttpResponseForbidden()
@@ -236,13 +278,33 @@ class CommentCreate(LoginMixin, CreateView):
         return reverse('auction', args=[auction_id])
 
 
+class AuctionComments(View):
+    """View for loading the next page of an auction's comments."""
+    def get(self, request, auction_id):
+        try:
+            comments = comment_page(auction_id, request.GET.get('cursor'))
+            if not comments.object_list and is_archived(auction_id):
+                comments = comment_page(auction_id, request.GET.get('cursor'), archived=True)
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        return render(request, 'auctions/comments.html', {'comments': comments, 'auction_id': auction_id})
+
+
+class AuctionEvents(View):
+    """
+    Fallback for the live event stream, which commerce/asgi.py serves under
+    ASGI. Under WSGI, 204 tells the browser's EventSource not to reconnect.
+    """
+    def get(self, request, auction_id):
+        return HttpResponse(status=204)
+
+
 class AuctionSearch(DataMixin, ListView):
     """View for searching auctions based on a query."""
-    paginate_by = None
 
     def get_queryset(self):
         query = self.request.GET.get('q')
-        return Auction.objects.filter(title__icontains=query, active=True)
+        return get_search_backend().search(query, Auction.objects.filter(active=True))
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -250,6 +312,16 @@ class AuctionSearch(DataMixin, ListView):
         return dict(list(context.items()) + list(c_def.items()))
 
 
+class Metrics(View):
+    """Prometheus scrape endpoint for this process's request metrics."""
+
+    def get(self, request):
+        token = getattr(settings, 'AUCTIONS_METRICS_TOKEN', None)
+        if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponseForbidden()
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 class PageNotFoundView(View):
     def dispatch(self, request, *args, **kwargs):
         return render(request, 'auctions/404.html', status=404)
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
+
+from .models import Auction
+from .trending import record_watch_on_commit
+
+Watch = Auction.watchers.through
+
+
+def is_watched(user, auction_id):
+    """Answer a single membership question with one EXISTS query."""
+    if not user.is_authenticated:
+        return False
+    return Watch.objects.filter(auction_id=auction_id, user_id=user.pk).exists()
+
+
+def watched_ids(user, auction_ids):
+    """Return the subset of auction_ids the user watches, in one query."""
+    if not user.is_authenticated:
+        return set()
+    return set(
+        Watch.objects.filter(user_id=user.pk, auction_id__in=list(auction_ids)).values_list('auction_id', flat=True)
+    )
+
+
+def annotate_watched(queryset, user):
+    """Annotate each auction with is_watched as a correlated EXISTS, with no per-row queries."""
+    if not user.is_authenticated:
+        return queryset.annotate(is_watched=Value(False))
+    return queryset.annotate(
+        is_watched=Exists(Watch.objects.filter(auction_id=OuterRef('pk'), user_id=user.pk))
+    )
+
+
+def toggle_watch(user, auction_id):
+    """Remove the auction from the user's watchlist if present, otherwise add it. Returns the new state."""
+    with transaction.atomic():
+        deleted, _ = Watch.objects.filter(auction_id=auction_id, user_id=user.pk).delete()
+        if deleted:
+            record_watch_on_commit(auction_id, False)
+            return False
+        Watch.objects.bulk_create([Watch(auction_id=auction_id, user_id=user.pk)], ignore_conflicts=True)
+        record_watch_on_commit(auction_id, True)
+        return True
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'commerce.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from auctions.events import EventStreamApp  # noqa: E402  (needs the app registry loaded above)
+
+# Live auction event streams are served here; everything else goes to Django.
+application = EventStreamApp(django_application)
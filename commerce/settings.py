@@ -11,12 +11,16 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import sys
 
 from auctions.config import KEY, my_pass, my_email, host
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# `manage.py test` runs against local stand-ins for Redis (see CACHES and CELERY_* below).
+TESTING = sys.argv[1:2] == ['test']
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/3.0/howto/deployment/checklist/
 
@@ -44,6 +48,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'auctions.metrics.MetricsMiddleware',
+    'auctions.nplusone.NPlusOneMiddleware',
+    'auctions.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,18 +80,65 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'commerce.wsgi.application'
 
+# Serve the index, category, search and auction pages with async views.
+# Only worth enabling when running commerce.asgi under uvicorn workers.
+AUCTIONS_ASYNC_VIEWS = os.environ.get('AUCTIONS_ASYNC_VIEWS') == '1'
+
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# Keep connections open between requests, and check them before reuse so a
+# dropped connection is replaced instead of failing the request.
+CONN_MAX_AGE = int(os.environ.get('AUCTIONS_CONN_MAX_AGE', 60))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        # A file-backed test database lets concurrent tests use real locking
+        # instead of the shared-cache in-memory database (ConcurrentBidTestCase
+        # fails without it). An aborted run leaves the file behind; run
+        # `manage.py test --noinput` to replace it without a prompt.
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
+# Read replicas (see auctions/routers.py), as a comma-separated list of
+# database files kept in sync with the primary.
+AUCTIONS_READ_REPLICAS = []
+for i, name in enumerate(filter(None, os.environ.get('AUCTIONS_DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{i}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    AUCTIONS_READ_REPLICAS.append(f'replica{i}')
+
+DATABASE_ROUTERS = ['auctions.routers.PrimaryReplicaRouter']
+# URL names of the read-only pages whose GET requests may be served from a replica.
+AUCTIONS_REPLICA_VIEWS = ['index', 'category_view', 'search', 'auction', 'auction_comments']
+# How long a user's reads stay on the primary after they write.
+AUCTIONS_REPLICA_PIN_SECONDS = 5
+# How long an unreachable replica is skipped.
+AUCTIONS_REPLICA_RETRY_SECONDS = 30
+
 AUTH_USER_MODEL = 'auctions.User'
 
+# Look users up in the cache rather than the database on every request.
+AUTHENTICATION_BACKENDS = ['auctions.backends.CachedModelBackend']
+
+# Sessions are read from the default cache (Redis, or local memory in
+# tests), so an authenticated request costs no session query. Every save is
+# written through to the database as well, so a Redis restart or eviction
+# does not log everybody out; the session is read back from the database and
+# cached again.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'default'
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -144,13 +198,53 @@ CELERY_RESULT_BACKEND = 'redis://' + REDIS_HOST + ':' + REDIS_PORT + '/0'
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'sweep-expired-auctions': {
+        'task': 'auctions.tasks.sweep_expired_auctions',
+        'schedule': 60.0,
+    },
+    'update-trending': {
+        'task': 'auctions.tasks.update_trending',
+        # Must match auctions.trending.DECAY_INTERVAL.
+        'schedule': 300.0,
+    },
+}
+if TESTING:
+    # Tasks queued from on_commit callbacks run inline, without a broker.
+    CELERY_BROKER_URL = 'memory://'
+    CELERY_RESULT_BACKEND = 'cache+memory://'
+    CELERY_TASK_ALWAYS_EAGER = True
+    CELERY_TASK_EAGER_PROPAGATES = True
 
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        # Counts hits and misses for /metrics, then delegates to OPTIONS['BACKEND'].
+        'BACKEND': 'auctions.metrics.MeteredCache',
         'LOCATION': 'redis://redis:6379/0',
         'OPTIONS': {
+            'BACKEND': 'django_redis.cache.RedisCache',
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         }
     }
-}
\ No newline at end of file
+}
+if TESTING:
+    # Tests clear the cache freely, so they must never reach the shared Redis database.
+    CACHES['default']['LOCATION'] = 'auctions-tests'
+    CACHES['default']['OPTIONS'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+
+# LIVE EVENTS (see auctions/events.py)
+# Every process that publishes or streams events must share this Redis URL.
+AUCTIONS_EVENTS_REDIS_URL = os.environ.get('AUCTIONS_EVENTS_REDIS_URL')
+# Allows the in-process broker instead, for a single process that does both.
+AUCTIONS_EVENTS_IN_PROCESS = TESTING or os.environ.get('AUCTIONS_EVENTS_IN_PROCESS') == '1'
+
+
+# METRICS (see auctions/metrics.py)
+AUCTIONS_METRICS_SAMPLE_RATE = 1.0
+AUCTIONS_SLOW_REQUEST_SECONDS = None
+AUCTIONS_METRICS_TOKEN = os.environ.get('AUCTIONS_METRICS_TOKEN')
+
+# N+1 query detection (see auctions/nplusone.py): 'log' on staging, 'raise' in tests.
+AUCTIONS_NPLUSONE = os.environ.get('AUCTIONS_NPLUSONE')
+AUCTIONS_NPLUSONE_THRESHOLD = 5
\ No newline at end of file